@@ -0,0 +1,104 @@
+"""
+Benchmark the codecs that read griddles and write Specs (see `griddler.codecs`).
+
+For each codec and each size 10^e, this reports the wall time of:
+
+- load-yaml, load-json: reading a v0.4 griddle whose experiment is an inline list
+  of 10^e Specs
+- write-json, write-ndjson, write-yaml: writing 10^e Specs to a null sink
+
+Run from the repository root:
+
+    python -m benchmarks.codecs
+"""
+
+import argparse
+import io
+import json
+import sys
+import time
+from typing import Any
+
+import yaml
+
+import griddler.__main__
+import griddler.codecs
+import griddler.writers
+from benchmarks.run import _NullSink
+
+
+def _specs(e: int) -> list[dict]:
+    return [
+        {"R0": 1.0 + i / 10**e, "method": ["newton", "brent"][i % 2], "seed": i}
+        for i in range(10**e)
+    ]
+
+
+def run(codecs: list[str], exponents: list[int]) -> list[dict[str, Any]]:
+    """Run the benchmarks.
+
+    Args:
+        codecs (list[str]): names of codecs in `griddler.codecs.CODECS`
+        exponents (list[int]): benchmark 10^e Specs for each e
+
+    Returns:
+        list[dict]: one record per codec, size, and operation
+    """
+    records = []
+    for e in exponents:
+        specs = _specs(e)
+        griddle = {"schema": "v0.4", "experiment": specs}
+        texts = {"yaml": yaml.dump(griddle), "json": json.dumps(griddle)}
+
+        for codec in codecs:
+            operations = {
+                f"load-{format}": lambda format=format: griddler.__main__._load(
+                    io.StringIO(texts[format]), format, codec
+                )
+                for format in texts
+            } | {
+                f"write-{format}": lambda format=format: griddler.writers.write(
+                    iter(specs), _NullSink(), format, codec=codec
+                )
+                for format in ["json", "ndjson", "yaml"]
+            }
+
+            for operation, f in operations.items():
+                start = time.perf_counter()
+                f()
+                seconds = time.perf_counter() - start
+
+                records.append(
+                    {
+                        "codec": codec,
+                        "size": e,
+                        "operation": operation,
+                        "seconds": seconds,
+                    }
+                )
+                print(
+                    f"{codec:<7} 10^{e:<2} {operation:<13} {seconds:9.4f} s",
+                    file=sys.stderr,
+                    flush=True,
+                )
+
+    return records
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="benchmarks.codecs", description="Benchmark griddler's codecs."
+    )
+    parser.add_argument(
+        "--min-size", type=int, default=3, help="smallest size, as 10^e (default: 3)"
+    )
+    parser.add_argument(
+        "--max-size", type=int, default=5, help="largest size, as 10^e (default: 5)"
+    )
+    args = parser.parse_args(args)
+
+    run(griddler.codecs.CODECS, list(range(args.min_size, args.max_size + 1)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Synthetic griddles for benchmarks.
+
+Each generator takes an exponent `e` and returns a griddle whose Experiment has
+on the order of 10^e Specs.
+"""
+
+from typing import Callable
+
+
+def v01_grid(e: int) -> dict:
+    """v0.1 grid of `e` parameters with 10 values each: exactly 10^e Specs"""
+    return {
+        "schema": "v0.1",
+        "baseline_parameters": {"R0": 1.5, "gamma": 0.3},
+        "grid_parameters": {f"p{i}": list(range(10)) for i in range(e)},
+    }
+
+
+def v01_nested(e: int) -> dict:
+    """
+    v0.1 grid whose first parameter is a scenario, with one nest per scenario:
+    exactly 10^e Specs
+    """
+    griddle = v01_grid(e)
+    griddle["grid_parameters"] = {
+        "scenario": [f"s{j}" for j in range(10)],
+        **{f"p{i}": list(range(10)) for i in range(1, e)},
+    }
+    griddle["nested_parameters"] = [
+        {"scenario": f"s{j}", "beta": j / 10} for j in range(10)
+    ]
+    return griddle
+
+
+def v03_conditional(e: int) -> dict:
+    """
+    v0.3 griddle with a bundle, varying parameters, and parameters conditional on
+    a method: 4 * 10^(e - 1) Specs
+    """
+    parameters = {
+        "scenario": {"R0": [1.5, 2.0], "gamma": [0.3, 0.4]},
+        "method": {"vary": ["newton", "brent"]},
+        **{f"p{i}": {"vary": list(range(10))} for i in range(e - 2)},
+        "seed": {"vary": list(range(5))},
+        "start_point": {
+            "if": {"equals": {"method": "newton"}},
+            "vary": [0.25, 0.5, 0.75],
+        },
+        "tolerance": {"if": {"equals": {"method": "newton"}}, "fix": 0.001},
+        "bounds": {"if": {"equals": {"method": "brent"}}, "fix": [0.0, 1.0]},
+    }
+    return {"schema": "v0.3", "parameters": parameters}
+
+
+def v03_many_keys(e: int) -> dict:
+    """
+    v0.3 griddle of 2e switches, each with a parameter conditional on that switch
+    alone, so that every condition is on a different key: exactly 10^e Specs
+    """
+    switches = {f"switch{i}": {"vary": [False, True]} for i in range(2 * e)}
+    # with its conditional parameter, each even switch gives 2 Specs, and each odd
+    # switch 5
+    conditionals = {
+        f"x{i}": {
+            "if": {"equals": {f"switch{i}": True}},
+            "vary": list(range(1 if i % 2 == 0 else 4)),
+        }
+        for i in range(2 * e)
+    }
+    return {"schema": "v0.3", "parameters": {**switches, **conditionals}}
+
+
+def v04_tree(e: int) -> dict:
+    """
+    v0.4 product of `e` factors, each a union of a list and a product of lists:
+    exactly 10^e Specs
+    """
+    factors = [
+        {
+            "union": [
+                [{f"p{i}": j} for j in range(4)],
+                {
+                    "product": [
+                        [{f"p{i}": j} for j in range(4, 6)],
+                        [{f"q{i}": j} for j in range(3)],
+                    ]
+                },
+            ]
+        }
+        for i in range(e)
+    ]
+    return {"schema": "v0.4", "experiment": {"product": factors}}
+
+
+GRIDDLES: dict[str, Callable[[int], dict]] = {
+    "v01_grid": v01_grid,
+    "v01_nested": v01_nested,
+    "v03_conditional": v03_conditional,
+    "v03_many_keys": v03_many_keys,
+    "v04_tree": v04_tree,
+}
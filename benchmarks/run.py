@@ -0,0 +1,193 @@
+"""
+Benchmark parsing, expanding, and serializing griddles of increasing size.
+
+For each synthetic griddle (see `benchmarks.griddles`) and each size 10^e, this
+reports the wall time and peak traced memory of three stages:
+
+- parse: `griddler.parse()` on the griddle
+- expand: iterating over every Spec in the Experiment
+- serialize: writing every Spec as newline-delimited JSON to a null sink
+
+Results can be saved as a baseline, and later runs compared against it:
+
+    python -m benchmarks.run --save benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable
+
+import griddler
+import griddler.writers
+from benchmarks.griddles import GRIDDLES
+
+# a stage is slower than its baseline if its time is this many times greater
+REGRESSION_RATIO = 1.25
+
+
+class _NullSink:
+    """Text file that discards everything written to it"""
+
+    def write(self, text: str) -> int:
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+def _expand(experiment: griddler.Experiment) -> None:
+    for _ in experiment:
+        pass
+
+
+def _serialize(experiment: griddler.Experiment) -> None:
+    griddler.writers.write(iter(experiment), _NullSink(), "ndjson")
+
+
+STAGES: dict[str, Callable[[Any], Any]] = {
+    "parse": griddler.parse,
+    "expand": _expand,
+    "serialize": _serialize,
+}
+
+
+def _measure(f: Callable[[Any], Any], x: Any, memory: bool) -> dict[str, float]:
+    """Time a function, then, optionally, rerun it to trace its peak memory"""
+    start = time.perf_counter()
+    f(x)
+    result = {"seconds": time.perf_counter() - start}
+
+    if memory:
+        tracemalloc.start()
+        f(x)
+        result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return result
+
+
+def run(
+    griddles: list[str], exponents: list[int], memory: bool = True
+) -> list[dict[str, Any]]:
+    """Run the benchmarks.
+
+    Args:
+        griddles (list[str]): names of griddle generators in `GRIDDLES`
+        exponents (list[int]): benchmark griddles of about 10^e Specs for each e
+        memory (bool): if True, also measure the peak memory of each stage
+
+    Returns:
+        list[dict]: one record per griddle, size, and stage
+    """
+    records = []
+    for name in griddles:
+        for e in exponents:
+            griddle = GRIDDLES[name](e)
+            experiment = griddler.parse(griddle)
+            n_specs = len(experiment)
+
+            for stage, f in STAGES.items():
+                result = _measure(
+                    f, griddle if stage == "parse" else experiment, memory
+                )
+                record = {"griddle": name, "size": e, "stage": stage}
+                record |= {"n_specs": n_specs, **result}
+                record["specs_per_second"] = n_specs / max(result["seconds"], 1e-9)
+                records.append(record)
+
+                print(_format(record), file=sys.stderr, flush=True)
+
+    return records
+
+
+def compare(records: list[dict[str, Any]], baseline: list[dict[str, Any]]) -> list[str]:
+    """Compare results to a baseline.
+
+    Returns:
+        list[str]: descriptions of the stages that are slower than the baseline by
+          more than `REGRESSION_RATIO`
+    """
+    baseline_seconds = {
+        (x["griddle"], x["size"], x["stage"]): x["seconds"] for x in baseline
+    }
+
+    regressions = []
+    for record in records:
+        key = (record["griddle"], record["size"], record["stage"])
+        if key not in baseline_seconds:
+            continue
+
+        ratio = record["seconds"] / max(baseline_seconds[key], 1e-9)
+        line = f"{_format(record)}  {ratio:5.2f}x baseline"
+        print(line, flush=True)
+
+        if ratio > REGRESSION_RATIO:
+            regressions.append(line)
+
+    return regressions
+
+
+def _format(record: dict[str, Any]) -> str:
+    line = (
+        f"{record['griddle']:<16} 10^{record['size']:<2} {record['stage']:<9} "
+        f"{record['n_specs']:>10} specs {record['seconds']:9.4f} s "
+        f"{record['specs_per_second']:12.0f} specs/s"
+    )
+    if "peak_bytes" in record:
+        line += f" {record['peak_bytes'] / 2**20:9.1f} MiB"
+
+    return line
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="benchmarks.run", description="Benchmark griddler at scale."
+    )
+    parser.add_argument(
+        "--griddle",
+        action="append",
+        choices=list(GRIDDLES),
+        help="griddle generator to benchmark (repeatable; default: all)",
+    )
+    parser.add_argument(
+        "--min-size", type=int, default=2, help="smallest size, as 10^e (default: 2)"
+    )
+    parser.add_argument(
+        "--max-size", type=int, default=5, help="largest size, as 10^e (default: 5)"
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="do not measure peak memory"
+    )
+    parser.add_argument(
+        "--save", type=argparse.FileType("w"), help="save results to this file"
+    )
+    parser.add_argument(
+        "--compare",
+        type=argparse.FileType("r"),
+        help="compare results to this baseline, exiting with an error on regression",
+    )
+    args = parser.parse_args(args)
+
+    records = run(
+        args.griddle or list(GRIDDLES),
+        list(range(args.min_size, args.max_size + 1)),
+        memory=not args.no_memory,
+    )
+
+    if args.save is not None:
+        json.dump(records, args.save, indent=2)
+        args.save.write("\n")
+
+    if args.compare is not None:
+        regressions = compare(records, json.load(args.compare))
+        if regressions:
+            print("Regressions:", *regressions, sep="\n", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
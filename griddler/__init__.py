@@ -1,22 +1,126 @@
-__all__ = ["Experiment", "parse"]
+__all__ = ["Experiment", "Spec", "count", "diff", "parse", "profile"]
 
-import griddler.schemas.v01
-import griddler.schemas.v03
-import griddler.schemas.v04
-from griddler.core import Experiment
+import importlib
+import os
+from types import ModuleType
 
+from griddler.core import Experiment, Spec
+from griddler.diffing import diff
+from griddler.optimizer import optimize as _optimize
+from griddler.profiling import profile, step
 
-def parse(griddle: dict) -> Experiment:
-    """Parse a griddle into an Experiment."""
+# schema modules are only imported when a griddle uses them, so that, e.g., v0.1
+# griddles do not pay for importing jsonschema
+_SCHEMA_MODULES = {
+    "v0.1": "griddler.schemas.v01",
+    "v0.3": "griddler.schemas.v03",
+    "v0.4": "griddler.schemas.v04",
+}
+
+
+def parse(
+    griddle: dict,
+    columnar: bool = False,
+    max_specs: int | None = None,
+    workers: int = 1,
+    cache: str | os.PathLike | None = None,
+    optimize: bool = True,
+) -> Experiment:
+    """Parse a griddle into an Experiment.
+
+    Every schema is parsed into the same tree of Experiments, which is then
+    optimized (see `griddler.optimizer`).
+
+    Args:
+        griddle (dict): griddle
+        columnar (bool): if True, return a `ColumnarExperiment`, which stores
+          parameter values in NumPy arrays rather than in dictionaries. Requires
+          numpy.
+        max_specs (int | None): if the griddle has more than this many Specs,
+          raise an error before parsing it. See `count()`.
+        workers (int): number of processes that expand the Specs of griddles
+          that are expanded as they are parsed (i.e., v0.1 nests). Other
+          griddles are parsed into lazy Experiments, so this has no effect; see
+          `griddler.writers.write_experiment()` to expand them in parallel.
+        cache (str | os.PathLike | None): if not None, a directory in which to
+          cache the expanded Experiment, so that parsing the same griddle again
+          reads it from disk without validating or expanding it. See
+          `griddler.cache`.
+        optimize (bool): if False, do not optimize the parsed Experiment tree.
+          The Specs are the same either way.
+
+    Returns:
+        Experiment: experiment
+    """
     assert isinstance(griddle, dict), "griddle must be a dictionary"
     assert "schema" in griddle, "griddle must have a schema"
 
-    match griddle["schema"]:
-        case "v0.1":
-            return griddler.schemas.v01.parse(griddle)
-        case "v0.3":
-            return griddler.schemas.v03.parse(griddle)
-        case "v0.4":
-            return griddler.schemas.v04.parse(griddle)
-        case _:
-            raise RuntimeError(f"Unknown griddle schema: {griddle['schema']}")
+    if cache is None:
+        experiment = _parse(griddle, max_specs, workers, optimize)
+    else:
+        import griddler.cache
+
+        experiment = griddler.cache.load(cache, griddle)
+        if experiment is None:
+            experiment = _parse(griddle, max_specs, workers, optimize)
+            griddler.cache.save(cache, griddle, experiment)
+        else:
+            _check_max_specs(len(experiment), max_specs)
+
+    if columnar:
+        from griddler.columnar import ColumnarExperiment
+
+        experiment = ColumnarExperiment.from_experiment(experiment)
+
+    return experiment
+
+
+def _parse(
+    griddle: dict, max_specs: int | None, workers: int, optimize: bool
+) -> Experiment:
+    """Parse a griddle with its schema's module, and optimize the Experiment"""
+    module = _schema_module(griddle["schema"])
+
+    if max_specs is not None:
+        _check_max_specs(module.count(griddle), max_specs)
+
+    if workers > 1 and griddle["schema"] == "v0.1":
+        experiment = module.parse(griddle, workers=workers)
+    else:
+        experiment = module.parse(griddle)
+
+    if optimize:
+        with step("optimize"):
+            experiment = _optimize(experiment)
+
+    return experiment
+
+
+def _check_max_specs(n: int, max_specs: int | None) -> None:
+    if max_specs is not None and n > max_specs:
+        raise RuntimeError(
+            f"Griddle has {n} Specs, more than the maximum of {max_specs}"
+        )
+
+
+def count(griddle: dict) -> int:
+    """Count the Specs in a griddle, without expanding it.
+
+    Args:
+        griddle (dict): griddle
+
+    Returns:
+        int: number of Specs that `parse()` would produce
+    """
+    assert isinstance(griddle, dict), "griddle must be a dictionary"
+    assert "schema" in griddle, "griddle must have a schema"
+
+    return _schema_module(griddle["schema"]).count(griddle)
+
+
+def _schema_module(schema: str) -> ModuleType:
+    """Import the module that parses griddles of this schema"""
+    if schema not in _SCHEMA_MODULES:
+        raise RuntimeError(f"Unknown griddle schema: {schema}")
+
+    return importlib.import_module(_SCHEMA_MODULES[schema])
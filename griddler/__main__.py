@@ -1,36 +1,467 @@
 import argparse
+import concurrent.futures
+import glob
+import io
 import json
+import os
+import re
 import sys
+from pathlib import Path
+from typing import IO, Sequence
 
 import yaml
 
 import griddler
+import griddler.codecs
+import griddler.core
+import griddler.optimizer
+import griddler.writers
 
 
 def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+
+    # commands are recognized by name, so that `griddler INPUT` still parses INPUT
+    if args and args[0] in COMMANDS:
+        return COMMANDS[args[0]](args[1:])
+
     parser = argparse.ArgumentParser(
         prog="griddler",
-        description="Parse a griddle into a list of dictionaries.",
+        description=(
+            "Parse griddles into lists of dictionaries. Other commands: "
+            + ", ".join(COMMANDS)
+        ),
     )
 
+    _add_format_arguments(parser)
     parser.add_argument(
-        "--from",
-        "-f",
+        "input",
+        nargs="*",
+        metavar="INPUT",
+        help=(
+            "input griddles: files, glob patterns, or directories of .yaml, .yml, "
+            "and .json files (default: stdin)"
+        ),
+    )
+    parser.add_argument(
+        "--to",
+        "-t",
         nargs="?",
-        default="yaml",
-        choices=["json", "yaml"],
+        default="json",
+        choices=griddler.writers.FORMATS,
         metavar="FORMAT",
-        dest="from_",  # to avoid collision with reserved word "from"
-        help="input format (json|yaml; default: yaml)",
+        help="output format (json|yaml|ndjson|json-seq|binary; default: json)",
+    )
+    parser.add_argument(
+        "--output",
+        "-o",
+        nargs="?",
+        type=argparse.FileType("w"),
+        default=sys.stdout,
+        metavar="OUTPUT",
+        help="output parameter sets file (default: stdout)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        default=None,
+        metavar="DIR",
+        help=(
+            "write each input's parameter sets to a file in this directory, named "
+            "after the input. Otherwise, the parameter sets of several inputs are "
+            "written to OUTPUT as one stream of ndjson or json-seq records tagged "
+            "with their input"
+        ),
+    )
+    parser.add_argument(
+        "--where",
+        type=_parse_where,
+        action="append",
+        default=[],
+        metavar="EXPR",
+        help=(
+            "output only the parameter sets where a parameter compares to a value, "
+            'like "R0>2" or "distribution==gamma", with one of ==, !=, <, <=, >, >=. '
+            "The value is read as yaml. Can be given more than once, and is applied "
+            "before --index, --shard, and --sample"
+        ),
+    )
+    selection = parser.add_mutually_exclusive_group()
+    selection.add_argument(
+        "--index",
+        "-i",
+        type=int,
+        default=None,
+        metavar="INDEX",
+        help="output only the parameter set at this (0-based) index",
+    )
+    selection.add_argument(
+        "--shard",
+        type=_parse_shard,
+        default=None,
+        metavar="K/N",
+        help="output only the K-th (0-based) of N shards of the parameter sets",
+    )
+    selection.add_argument(
+        "--sample",
+        type=int,
+        default=None,
+        metavar="K",
+        help="output only a random sample of K parameter sets, in order",
+    )
+    parser.add_argument(
+        "--sample-method",
+        default="uniform",
+        choices=["uniform", "latin-hypercube"],
+        help=(
+            "draw the sample uniformly, or as a Latin hypercube over the factors "
+            "of a product (default: uniform)"
+        ),
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="seed for --sample, so that the same seed gives the same sample",
+    )
+    parser.add_argument(
+        "--shard-strategy",
+        default="contiguous",
+        choices=["contiguous", "strided"],
+        help="how parameter sets are assigned to shards (default: contiguous)",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=argparse.FileType("w"),
+        default=None,
+        metavar="MANIFEST",
+        help=(
+            "also write a manifest of the parameter sets' indices and stable IDs, "
+            "as newline-delimited JSON"
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        type=argparse.FileType("w"),
+        default=None,
+        metavar="PROFILE",
+        help=(
+            "also write a JSON report of the time, peak memory, and number of "
+            "parameter sets of each step of parsing and each node of the experiment"
+        ),
+    )
+    parser.add_argument(
+        "--profile-max-expand",
+        type=int,
+        default=None,
+        metavar="N",
+        help=(
+            "with --profile, do not expand nodes with more than N parameter sets, "
+            "only report their number (default: expand every node)"
+        ),
+    )
+    parser.add_argument(
+        "--explain",
+        action="store_true",
+        help=(
+            "instead of the parameter sets, write the tree of the experiment as "
+            "parsed and as optimized, with the number of parameter sets of each node"
+        ),
     )
+    parser.add_argument(
+        "--max-specs",
+        type=int,
+        default=None,
+        metavar="N",
+        help=(
+            "stop with an error, before expanding the experiment, if it has more "
+            "than N parameter sets"
+        ),
+    )
+
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=_parse_jobs,
+        default=1,
+        metavar="N",
+        help=(
+            "expand and encode the parameter sets in N processes, or, with several "
+            "inputs, parse N inputs at a time; the output is the same as with one "
+            "(default: 1)"
+        ),
+    )
+
+    parser.add_argument(
+        "--cache",
+        default=None,
+        metavar="DIR",
+        help=(
+            "cache the parameter sets in this directory, so that parsing the same "
+            "griddle again reads them from the cache"
+        ),
+    )
+
+    args = parser.parse_args(args)
+
+    # Show help if no args are provided
+    if not args.input and sys.stdin.isatty():
+        parser.print_help()
+        sys.exit(1)
+
+    paths = _expand_inputs(parser, args.input)
+    options = {
+        "from_": args.from_,
+        "codec": args.codec,
+        "to": args.to,
+        "index": args.index,
+        "shard": args.shard,
+        "shard_strategy": args.shard_strategy,
+        "sample": args.sample,
+        "sample_method": args.sample_method,
+        "seed": args.seed,
+        "max_specs": args.max_specs,
+        "cache": args.cache,
+        "jobs": args.jobs,
+        "where": args.where,
+    }
+
+    if len(paths) > 1 or args.output_dir is not None:
+        _main_batch(parser, args, paths, options)
+        return
+
+    if paths:
+        with open(paths[0]) as f:
+            raw = _load(f, args.from_, args.codec)
+    else:
+        raw = _load(sys.stdin, args.from_, args.codec)
+
+    if args.explain:
+        _explain(raw, args.output, options)
+        return
+
+    parse_options = {
+        "max_specs": args.max_specs,
+        "workers": args.jobs,
+        "cache": args.cache,
+    }
+    if args.profile is not None:
+        experiment, report = griddler.profile(
+            raw, max_expand=args.profile_max_expand, **parse_options
+        )
+        json.dump(report, args.profile, indent=2)
+        args.profile.flush()
+    else:
+        experiment = griddler.parse(raw, **parse_options)
+
+    experiment = _filter(experiment, options)
+    _write(experiment, args.output, options, manifest=args.manifest)
+
+
+def _write(
+    experiment: griddler.Experiment,
+    output: IO[str],
+    options: dict,
+    manifest: IO[str] | None = None,
+) -> None:
+    """Write the selected parameter sets of an Experiment"""
+    if options["index"] is not None:
+        spec = dict(experiment[options["index"]])
+        if manifest is not None:
+            index = range(len(experiment))[options["index"]]
+            griddler.writers.write_manifest([(index, spec)], manifest)
+
+        codec = griddler.codecs.get(options["codec"])
+        if options["to"] == "yaml":
+            yaml.dump(spec, output, Dumper=codec.yaml_dumper)
+        elif options["to"] == "json":
+            output.write(codec.json_dumps_indented(spec))
+        else:
+            griddler.writers.write(
+                [spec], output, options["to"], codec=options["codec"]
+            )
+
+        return
+
+    griddler.writers.write_experiment(
+        experiment,
+        output,
+        options["to"],
+        indices=_selected_indices(experiment, options),
+        workers=options["jobs"],
+        manifest=manifest,
+        codec=options["codec"],
+    )
+
+
+def _explain(raw: dict, output: IO[str], options: dict) -> None:
+    """Write the parsed and the optimized (and filtered) Experiment trees"""
+    experiment = griddler.parse(raw, max_specs=options["max_specs"], optimize=False)
+    output.write("parsed:\n" + griddler.optimizer.explain(experiment))
+
+    experiment = _filter(griddler.optimizer.optimize(experiment), options)
+    output.write("optimized:\n" + griddler.optimizer.explain(experiment))
+
+
+def _filter(experiment: griddler.Experiment, options: dict) -> griddler.Experiment:
+    """Keep only the parameter sets selected by --where"""
+    for name, op, value in options["where"]:
+        experiment = experiment.where(name, op, value)
+
+    return experiment
+
+
+def _selected_indices(experiment: griddler.Experiment, options: dict) -> Sequence[int]:
+    """Indices of the parameter sets selected by --index, --shard, or --sample"""
+    if options["index"] is not None:
+        index = griddler.core._check_index(options["index"], len(experiment))
+        return range(index, index + 1)
+    elif options["shard"] is not None:
+        k, n = options["shard"]
+        return experiment.shard_indices(k, n, strategy=options["shard_strategy"])
+    elif options["sample"] is not None:
+        return experiment.sample_indices(
+            options["sample"], seed=options["seed"], method=options["sample_method"]
+        )
+    else:
+        return range(len(experiment))
+
+
+def _main_batch(
+    parser: argparse.ArgumentParser,
+    args: argparse.Namespace,
+    paths: list[str],
+    options: dict,
+) -> None:
+    """Parse several griddles in one process, or in a pool of processes"""
+    if args.manifest is not None or args.profile is not None or args.explain:
+        parser.error(
+            "--manifest, --profile, and --explain can only be used with one input"
+        )
+
+    if args.output_dir is None and args.to not in TAGGED_FORMATS:
+        parser.error(
+            "several inputs are written as one stream of tagged records, which "
+            "must be ndjson or json-seq; or use --output-dir"
+        )
+
+    if args.output_dir is not None:
+        stems = [Path(path).stem for path in paths]
+        if len(set(stems)) < len(stems):
+            parser.error("inputs written to --output-dir must have different names")
+
+        Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+
+    # the pool is across inputs, so each input is written by one process
+    jobs = options["jobs"]
+    options = options | {"jobs": 1}
+
+    if jobs == 1:
+        for path in paths:
+            _run_input(path, options, args.output_dir, args.output)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            texts = executor.map(
+                _run_input,
+                paths,
+                [options] * len(paths),
+                [args.output_dir] * len(paths),
+            )
+            for text in texts:
+                args.output.write(text)
+                args.output.flush()
+
+
+def _run_input(
+    path: str, options: dict, output_dir: str | None, output: IO[str] | None = None
+) -> str:
+    """
+    Parse one of several griddles, and write its parameter sets to a file in
+    `output_dir`, or as tagged records to `output`. If there is no `output`, return
+    the tagged records.
+    """
+    with open(path) as f:
+        raw = _load(f, options["from_"], options["codec"])
+
+    experiment = griddler.parse(
+        raw, max_specs=options["max_specs"], cache=options["cache"]
+    )
+    experiment = _filter(experiment, options)
+
+    if output_dir is not None:
+        extension = griddler.writers.EXTENSIONS[options["to"]]
+        with open(Path(output_dir) / (Path(path).stem + extension), "w") as f:
+            _write(experiment, f, options)
+
+        return ""
+
+    text = io.StringIO() if output is None else output
+    indices = _selected_indices(experiment, options)
+    records = (
+        {"input": path, "index": index, "spec": griddler.core._as_dict(spec)}
+        for index, spec in zip(
+            indices, griddler.writers._iter_indices(experiment, indices)
+        )
+    )
+    griddler.writers.write(records, text, options["to"], codec=options["codec"])
+
+    return "" if output is not None else text.getvalue()
+
+
+def _expand_inputs(parser: argparse.ArgumentParser, inputs: list[str]) -> list[str]:
+    """Expand glob patterns and directories into paths of griddles"""
+    paths = []
+    for pattern in inputs:
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern))
+            if not matches:
+                parser.error(f"no griddles match {pattern}")
+
+            paths += matches
+        elif os.path.isdir(pattern):
+            paths += sorted(
+                str(path)
+                for path in Path(pattern).iterdir()
+                if path.suffix in GRIDDLE_SUFFIXES and path.is_file()
+            )
+        elif os.path.isfile(pattern):
+            paths.append(pattern)
+        else:
+            parser.error(f"no such griddle: {pattern}")
+
+    return paths
+
+
+def count(args: list[str]) -> None:
+    """Print the number of parameter sets in a griddle"""
+    parser = argparse.ArgumentParser(
+        prog="griddler count",
+        description="Count the parameter sets in a griddle, without expanding it.",
+    )
+    _add_input_arguments(parser)
+
+    args = parser.parse_args(args)
+    print(griddler.count(_read_griddle(parser, args)))
+
+
+def diff(args: list[str]) -> None:
+    """Write the parameter sets added (and optionally removed) between griddles"""
+    parser = argparse.ArgumentParser(
+        prog="griddler diff",
+        description=(
+            "Write the parameter sets that are in the new griddle but not the old "
+            "one, e.g., to run only the new simulations."
+        ),
+    )
+    _add_format_arguments(parser)
     parser.add_argument(
         "--to",
         "-t",
         nargs="?",
         default="json",
-        choices=["json", "yaml"],
+        choices=griddler.writers.FORMATS,
         metavar="FORMAT",
-        help="output format (json|yaml; default: json)",
+        help="output format (json|yaml|ndjson|json-seq|binary; default: json)",
     )
     parser.add_argument(
         "--output",
@@ -39,8 +470,85 @@ def main(args=None):
         type=argparse.FileType("w"),
         default=sys.stdout,
         metavar="OUTPUT",
-        help="output parameter sets file (default: stdout)",
+        help="output added parameter sets file (default: stdout)",
+    )
+    parser.add_argument(
+        "--removed",
+        type=argparse.FileType("w"),
+        default=None,
+        metavar="REMOVED",
+        help="also write the parameter sets in the old griddle but not the new one",
+    )
+    parser.add_argument(
+        "old", type=argparse.FileType("r"), metavar="OLD", help="old griddle"
     )
+    parser.add_argument(
+        "new", type=argparse.FileType("r"), metavar="NEW", help="new griddle"
+    )
+
+    args = parser.parse_args(args)
+    added, removed = griddler.diff(
+        _load(args.old, args.from_, args.codec), _load(args.new, args.from_, args.codec)
+    )
+
+    griddler.writers.write(added, args.output, args.to, codec=args.codec)
+    if args.removed is not None:
+        griddler.writers.write(removed, args.removed, args.to, codec=args.codec)
+
+
+def serve(args: list[str]) -> None:
+    """Serve parsed griddles until interrupted"""
+    parser = argparse.ArgumentParser(
+        prog="griddler serve",
+        description=(
+            "Keep parsed griddles in memory, and answer requests for their number "
+            "of parameter sets, one parameter set, or a range of them, over HTTP. "
+            "See griddler.server."
+        ),
+    )
+    address = parser.add_mutually_exclusive_group(required=True)
+    address.add_argument("--socket", metavar="PATH", help="Unix socket to listen on")
+    address.add_argument(
+        "--port", type=int, metavar="PORT", help="localhost port to listen on"
+    )
+    parser.add_argument(
+        "--max-experiments",
+        type=int,
+        default=None,
+        metavar="N",
+        help="keep at most N parsed griddles in memory",
+    )
+
+    args = parser.parse_args(args)
+
+    import griddler.server
+
+    service = griddler.server.Service(
+        args.max_experiments or griddler.server.MAX_EXPERIMENTS
+    )
+    server = griddler.server.make_server(args.socket, args.port, service)
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if args.socket is not None:
+                os.unlink(args.socket)
+
+
+COMMANDS = {"count": count, "diff": diff, "serve": serve}
+
+# formats in which several inputs' parameter sets are written as one stream
+TAGGED_FORMATS = ["ndjson", "json-seq"]
+
+# files in input directories that are read as griddles
+GRIDDLE_SUFFIXES = [".yaml", ".yml", ".json"]
+
+
+def _add_input_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the input format, codec, and input griddle arguments to a parser"""
+    _add_format_arguments(parser)
     parser.add_argument(
         "input",
         nargs="?",
@@ -50,28 +558,92 @@ def main(args=None):
         help="input griddle (default: stdin)",
     )
 
-    args = parser.parse_args(args)
 
+def _add_format_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the input format and codec arguments to a parser"""
+    parser.add_argument(
+        "--from",
+        "-f",
+        nargs="?",
+        default="yaml",
+        choices=["json", "yaml"],
+        metavar="FORMAT",
+        dest="from_",  # to avoid collision with reserved word "from"
+        help="input format (json|yaml; default: yaml)",
+    )
+    parser.add_argument(
+        "--codec",
+        default="auto",
+        choices=griddler.codecs.CODECS,
+        help=(
+            "yaml and JSON libraries: 'auto' uses libyaml and, for input, orjson "
+            "or ujson, if installed; 'fast' also uses them for output, whose "
+            "bytes can then differ; 'stdlib' uses neither (default: auto)"
+        ),
+    )
+
+
+def _read_griddle(parser: argparse.ArgumentParser, args: argparse.Namespace) -> dict:
+    """Load the input griddle, or show help if there is no input"""
     # Show help if no args are provided
     if args.input is sys.stdin and sys.stdin.isatty():
         parser.print_help()
         sys.exit(1)
 
-    if args.from_ == "yaml":
-        raw = yaml.safe_load(args.input)
-    elif args.from_ == "json":
-        raw = json.load(args.input)
-    else:
-        raise RuntimeError(f"Invalid input format {args.from_}")
+    return _load(args.input, args.from_, args.codec)
 
-    experiment_dicts = griddler.parse(raw).specs
 
-    if args.to == "yaml":
-        yaml.dump(experiment_dicts, args.output)
-    elif args.to == "json":
-        json.dump(experiment_dicts, args.output, indent=2)
+def _load(f: IO[str], format: str, codec: str = "auto") -> dict:
+    """Load a griddle from a file in this format"""
+    codec = griddler.codecs.get(codec)
+    if format == "yaml":
+        return yaml.load(f, Loader=codec.yaml_loader)
+    elif format == "json":
+        return codec.json_loads(f.read())
     else:
-        raise RuntimeError(f"Invalid output format {args.to}")
+        raise RuntimeError(f"Invalid input format {format}")
+
+
+def _parse_jobs(value: str) -> int:
+    """Parse a positive number of jobs"""
+    if not value.isdigit() or int(value) < 1:
+        raise argparse.ArgumentTypeError(f"jobs must be a positive integer: {value}")
+
+    return int(value)
+
+
+def _parse_shard(value: str) -> tuple[int, int]:
+    """Parse a shard argument like "2/8" into (2, 8)"""
+    try:
+        k, n = (int(x) for x in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"shard must look like K/N, not {value}")
+
+    if not 0 <= k < n:
+        raise argparse.ArgumentTypeError(f"shard K/N must have 0 <= K < N: {value}")
+
+    return k, n
+
+
+# the longest comparisons come first, so that "<=" is not read as "<"
+_WHERE = re.compile(r"^\s*([^=!<>\s]+)\s*(==|!=|<=|>=|<|>)(.*)$")
+
+
+def _parse_where(value: str) -> tuple[str, str, object]:
+    """Parse a filter like "R0>2" into ("R0", ">", 2)"""
+    match = _WHERE.match(value)
+    if match is None:
+        raise argparse.ArgumentTypeError(
+            f"filter must look like NAME==VALUE, NAME<VALUE, etc., not {value}"
+        )
+
+    name, op, text = match.groups()
+    try:
+        parsed = yaml.safe_load(text)
+    except yaml.YAMLError:
+        raise argparse.ArgumentTypeError(f"filter value is not yaml: {text}")
+
+    return name, op, parsed
 
 
 if __name__ == "__main__":
@@ -0,0 +1,175 @@
+"""
+An on-disk cache of parsed griddles.
+
+Each entry is a `griddler.store` of the leaves of the parsed Experiment tree,
+with the shape of the tree (see `griddler.store.write_tree()`), named by a hash
+of the JSON of the griddle and the griddler version. A cached griddle is neither
+validated nor parsed again, and its Experiment has the same products and unions
+as a parsed one, so that, e.g., `where()` and sampling give the same Specs. The
+JSON keeps the order of the griddle's keys, since it can change the order of the
+Specs and of their parameters.
+
+Only griddles that are exactly JSON, i.e., made of dictionaries with string
+keys, lists, strings, numbers, booleans, and None, are cached, since a store
+holds Specs as JSON and a cached Experiment must be the same as a parsed one.
+Other griddles, e.g., yaml with integer keys or dates, are never cached.
+
+Entries are written to a temporary file and renamed into place, so processes
+sharing a cache directory never read a partly written entry. Reading an entry
+updates its modification time, and the least recently used entries are deleted
+when the cache is larger than its bound.
+"""
+
+import hashlib
+import importlib.metadata
+import os
+import tempfile
+from pathlib import Path
+from typing import Any
+
+import griddler.store
+from griddler.core import _ORDERED_ENCODER, Experiment
+
+# default bound on the total size of a cache directory
+MAX_BYTES = 1024**3
+
+SUFFIX = ".griddler"
+
+
+def cacheable(griddle: dict) -> bool:
+    """
+    Is this griddle exactly JSON, so that it, and all its Specs, are the same after
+    a round trip through JSON? Every Spec value and parameter name comes from the
+    griddle, so checking the griddle checks the Specs.
+    """
+    return _is_json(griddle)
+
+
+def _is_json(value: Any) -> bool:
+    if value is None or type(value) in (str, int, float, bool):
+        return True
+    elif type(value) is list:
+        return all(_is_json(x) for x in value)
+    elif type(value) is dict:
+        return all(type(k) is str and _is_json(v) for k, v in value.items())
+    else:
+        return False
+
+
+def key(griddle: dict) -> str:
+    """The name of a griddle's cache entry.
+
+    Raises:
+        ValueError: if the griddle is not cacheable. See `cacheable()`.
+    """
+    if not cacheable(griddle):
+        raise ValueError("Griddle cannot be cached, since it is not exactly JSON")
+
+    try:
+        version = importlib.metadata.version("griddler")
+    except importlib.metadata.PackageNotFoundError:
+        version = "unknown"
+
+    text = _ORDERED_ENCODER.encode([version, griddle])
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def load(directory: str | os.PathLike, griddle: dict) -> Experiment | None:
+    """Read a griddle's Experiment from the cache.
+
+    Args:
+        directory (str | os.PathLike): cache directory
+        griddle (dict): griddle
+
+    Returns:
+        Experiment | None: the cached Experiment, or None if it is not cached or
+          cannot be cached
+    """
+    if not cacheable(griddle):
+        return None
+
+    path = Path(directory) / (key(griddle) + SUFFIX)
+
+    try:
+        # mark the entry as recently used, before opening it, so that a store is
+        # never left open if another process evicted the entry
+        os.utime(path)
+        store = griddler.store.open(path)
+    except FileNotFoundError:
+        return None
+
+    experiment = store.tree()
+    if experiment is not store:
+        # the leaves were read into memory
+        store.close()
+
+    return experiment
+
+
+def save(
+    directory: str | os.PathLike,
+    griddle: dict,
+    experiment: Experiment,
+    max_bytes: int = MAX_BYTES,
+) -> None:
+    """Write a griddle's Experiment to the cache, then evict old entries. Does
+    nothing if the griddle cannot be cached.
+
+    Args:
+        directory (str | os.PathLike): cache directory, which is made if needed
+        griddle (dict): griddle
+        experiment (Experiment): the parsed griddle, whose leaves are expanded
+        max_bytes (int): bound on the total size of the cache entries
+    """
+    if not cacheable(griddle):
+        return
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / (key(griddle) + SUFFIX)
+
+    with tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False) as f:
+        try:
+            griddler.store.write_tree(experiment, f)
+        except BaseException:
+            os.unlink(f.name)
+            raise
+
+    os.replace(f.name, path)
+    evict(directory, max_bytes, keep=path)
+
+
+def evict(
+    directory: str | os.PathLike, max_bytes: int = MAX_BYTES, keep: Path | None = None
+) -> None:
+    """Delete the least recently used entries until the cache fits in its bound.
+
+    Args:
+        directory (str | os.PathLike): cache directory
+        max_bytes (int): bound on the total size of the cache entries
+        keep (Path | None): an entry never to delete, e.g., one just written
+    """
+    entries = []
+    for path in Path(directory).glob("*" + SUFFIX):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            # another process evicted it
+            continue
+
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+
+        if path == keep:
+            continue
+
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+        total -= size
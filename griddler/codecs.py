@@ -0,0 +1,170 @@
+"""
+Codecs for reading griddles and writing Specs.
+
+A codec chooses the yaml loader and dumper and the JSON functions that the
+command line and `griddler.writers` use:
+
+- "stdlib": the pure-Python yaml loader and dumper, and the `json` module.
+- "auto": the libyaml-based yaml loader and dumper, if PyYAML was built with
+  libyaml, and the `json` module, so the output is the same as with "stdlib",
+  and any input that "stdlib" reads is read the same way.
+- "fast": as "auto", but reading and writing JSON with an accelerated backend
+  (orjson, then ujson), if installed. JSON that the backend rejects, e.g., with
+  `NaN` or `Infinity`, is read again with the `json` module, and values with a
+  NaN or infinite float, which orjson would write as `null` and ujson rejects,
+  are written with the `json` module. The output decodes to the same Specs, but
+  its bytes can differ, e.g., non-ASCII characters are not escaped, and floats
+  can be formatted differently.
+
+Each codec falls back to the standard library for anything not installed.
+"""
+
+import functools
+import json
+import math
+from typing import Any, Callable, NamedTuple
+
+import yaml
+
+CODECS = ["auto", "stdlib", "fast"]
+
+
+class Codec(NamedTuple):
+    """Functions for reading and writing yaml and JSON"""
+
+    name: str
+    yaml_loader: type
+    yaml_dumper: type
+    # decode a JSON document
+    json_loads: Callable[[str | bytes], Any]
+    # encode a value as compact JSON, with no whitespace
+    json_dumps: Callable[[Any], str]
+    # encode a value as JSON indented by 2 spaces
+    json_dumps_indented: Callable[[Any], str]
+
+
+@functools.cache
+def get(name: str = "auto") -> Codec:
+    """The codec with this name, using whichever backends are installed.
+
+    Args:
+        name (str): one of `CODECS`
+
+    Returns:
+        Codec: codec
+    """
+    if name not in CODECS:
+        raise RuntimeError(f"Unknown codec: {name}")
+
+    stdlib = Codec(
+        name=name,
+        yaml_loader=yaml.SafeLoader,
+        yaml_dumper=yaml.Dumper,
+        json_loads=json.loads,
+        json_dumps=_json_dumps,
+        json_dumps_indented=_json_dumps_indented,
+    )
+
+    if name == "stdlib":
+        return stdlib
+
+    codec = stdlib
+    if yaml.__with_libyaml__:
+        codec = codec._replace(yaml_loader=yaml.CSafeLoader, yaml_dumper=yaml.CDumper)
+
+    backend = _json_backend() if name == "fast" else None
+    if backend is not None:
+        loads, dumps, dumps_indented = backend
+        codec = codec._replace(
+            json_loads=_with_fallback(loads),
+            json_dumps=_finite_or(dumps, _json_dumps),
+            json_dumps_indented=_finite_or(dumps_indented, _json_dumps_indented),
+        )
+
+    return codec
+
+
+def _with_fallback(loads: Callable[[str | bytes], Any]) -> Callable[[str | bytes], Any]:
+    """
+    Decode JSON with this function, or, if it cannot, with the `json` module, which
+    also reads, e.g., `NaN` and `Infinity`
+    """
+
+    def loads_with_fallback(text: str | bytes) -> Any:
+        try:
+            return loads(text)
+        except ValueError:
+            return json.loads(text)
+
+    return loads_with_fallback
+
+
+def _finite_or(
+    dumps: Callable[[Any], str], fallback: Callable[[Any], str]
+) -> Callable[[Any], str]:
+    """
+    Encode JSON with this function or, for values with a NaN or infinite float,
+    which it could write as `null` or reject, with the fallback
+    """
+
+    def dumps_finite(x: Any) -> str:
+        try:
+            text = dumps(x)
+        except (OverflowError, ValueError, TypeError):
+            return fallback(x)
+
+        # a non-finite float could only have been written as null
+        if "null" in text and not _is_finite(x):
+            return fallback(x)
+
+        return text
+
+    return dumps_finite
+
+
+def _is_finite(x: Any) -> bool:
+    """Are all the floats in this value finite?"""
+    if isinstance(x, float):
+        return math.isfinite(x)
+    elif isinstance(x, dict):
+        return all(_is_finite(v) for v in x.values())
+    elif isinstance(x, (list, tuple)):
+        return all(_is_finite(v) for v in x)
+    else:
+        return True
+
+
+def _json_dumps(x: Any) -> str:
+    return json.dumps(x, separators=(",", ":"))
+
+
+def _json_dumps_indented(x: Any) -> str:
+    return json.dumps(x, indent=2)
+
+
+def _json_backend() -> tuple[Callable, Callable, Callable] | None:
+    """The loads, compact dumps, and indented dumps of an accelerated JSON library"""
+    try:
+        import orjson
+
+        return (
+            orjson.loads,
+            lambda x: orjson.dumps(x).decode(),
+            lambda x: orjson.dumps(x, option=orjson.OPT_INDENT_2).decode(),
+        )
+    except ImportError:
+        pass
+
+    try:
+        import ujson
+
+        options = {"ensure_ascii": False, "escape_forward_slashes": False}
+        return (
+            ujson.loads,
+            lambda x: ujson.dumps(x, **options),
+            lambda x: ujson.dumps(x, indent=2, **options),
+        )
+    except ImportError:
+        pass
+
+    return None
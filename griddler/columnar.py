@@ -0,0 +1,297 @@
+"""
+Columnar Experiments, backed by NumPy arrays.
+
+This module requires numpy, which can be installed with the `columnar` extra,
+e.g., `pip install griddler[columnar]`.
+"""
+
+import math
+from typing import Any, Iterable, Iterator
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError(
+        "Columnar Experiments require numpy. Install griddler[columnar]."
+    ) from e
+
+from griddler.core import (
+    Experiment,
+    ProductExperiment,
+    UnionExperiment,
+    _check_index,
+)
+
+# number of Specs converted from columns to dictionaries at a time
+BLOCK_SIZE = 10_000
+
+
+class ColumnarExperiment(Experiment):
+    """
+    An Experiment stored as columns rather than as a list of Specs.
+
+    Each parameter name maps to an array of values, one per Spec, and to a boolean
+    mask of which Specs have that parameter. (Unions of Experiments with different
+    parameters produce Specs without some parameters.)
+
+    Each Spec also has a layout: the order of its parameter names, as an index
+    into a list of layouts. Specs are converted back to dictionaries, with their
+    parameters in the same order as in the Experiment they were made from, only
+    when iterated.
+
+    Products use `np.repeat` and `np.tile`, and unions concatenate columns, so
+    neither operation makes any per-Spec dictionaries.
+    """
+
+    def __init__(
+        self,
+        columns: dict[str, np.ndarray],
+        masks: dict[str, np.ndarray],
+        n: int,
+        layouts: list[tuple[str, ...]] | None = None,
+        layout_ids: np.ndarray | None = None,
+    ):
+        """
+        Args:
+            columns (dict[str, np.ndarray]): values of each parameter
+            masks (dict[str, np.ndarray]): which Specs have each parameter
+            n (int): number of Specs
+            layouts (list[tuple[str, ...]] | None): parameter names, in order
+            layout_ids (np.ndarray | None): index of each Spec's layout in
+              `layouts`. If None, each Spec's parameters are in column order.
+        """
+        assert columns.keys() == masks.keys()
+        for key in columns:
+            assert columns[key].shape == masks[key].shape == (n,)
+
+        if layout_ids is None:
+            layouts, layout_ids = _layouts_from_masks(masks, n)
+
+        assert layout_ids.shape == (n,)
+
+        self.columns = columns
+        self.masks = masks
+        self.layouts = layouts
+        self.layout_ids = layout_ids
+        self._len = n
+
+    @classmethod
+    def from_specs(cls, specs: Iterable[dict]) -> "ColumnarExperiment":
+        """Make a columnar Experiment from a list of Specs"""
+        specs = list(specs)
+        keys = list(dict.fromkeys(key for spec in specs for key in spec))
+
+        columns = {}
+        masks = {}
+        for key in keys:
+            masks[key] = np.fromiter((key in spec for spec in specs), dtype=bool)
+            columns[key] = _column([spec.get(key) for spec in specs], masks[key])
+
+        layout_index = {}
+        layout_ids = np.fromiter(
+            (layout_index.setdefault(tuple(spec), len(layout_index)) for spec in specs),
+            dtype=np.int64,
+            count=len(specs),
+        )
+
+        return cls(columns, masks, len(specs), list(layout_index), layout_ids)
+
+    @classmethod
+    def from_experiment(cls, experiment: Experiment) -> "ColumnarExperiment":
+        """Make a columnar Experiment from any Experiment, without expanding it"""
+        if isinstance(experiment, ColumnarExperiment):
+            return experiment
+        elif isinstance(experiment, ProductExperiment):
+            return _product([cls.from_experiment(x) for x in experiment.factors])
+        elif isinstance(experiment, UnionExperiment):
+            return _union([cls.from_experiment(x) for x in experiment.branches])
+        else:
+            return cls.from_specs(experiment)
+
+    def to_experiment(self) -> Experiment:
+        """Convert to a list-of-Specs Experiment"""
+        return Experiment(self.specs)
+
+    @property
+    def specs(self) -> list[dict]:
+        return list(self)
+
+    def union(self, *others: Experiment) -> Experiment:
+        if all(isinstance(other, ColumnarExperiment) for other in others):
+            return _union([self, *others])
+        else:
+            return super().union(*others)
+
+    def product(self, *others: Experiment) -> Experiment:
+        if all(isinstance(other, ColumnarExperiment) for other in others):
+            return _product([self, *others])
+        else:
+            return super().product(*others)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[dict]:
+        return self._iter_range(0, len(self))
+
+    def __getitem__(self, index: int) -> dict:
+        index = _check_index(index, len(self))
+        return next(self._iter_range(index, index + 1))
+
+    def _iter_range(self, start: int, stop: int) -> Iterator[dict]:
+        for block_start in range(start, stop, BLOCK_SIZE):
+            block = slice(block_start, min(block_start + BLOCK_SIZE, stop))
+            # convert whole blocks of each column to Python objects at once
+            values = {key: self.columns[key][block].tolist() for key in self.columns}
+            layouts = [self.layouts[j] for j in self.layout_ids[block].tolist()]
+
+            for i, layout in enumerate(layouts):
+                yield {key: values[key][i] for key in layout}
+
+
+def _layouts_from_masks(
+    masks: dict[str, np.ndarray], n: int
+) -> tuple[list[tuple[str, ...]], np.ndarray]:
+    """Layouts with each Spec's parameters in column order"""
+    keys = list(masks)
+    if not keys:
+        return [()], np.zeros(n, dtype=np.int64)
+
+    present, layout_ids = np.unique(
+        np.stack([masks[key] for key in keys], axis=1), axis=0, return_inverse=True
+    )
+    layouts = [tuple(k for k, p in zip(keys, row) if p) for row in present.tolist()]
+    return layouts, layout_ids.reshape(n).astype(np.int64)
+
+
+def _merge_layouts(
+    layouts: list[tuple[str, ...]],
+    layout_ids: np.ndarray,
+    other_layouts: list[tuple[str, ...]],
+    other_ids: np.ndarray,
+) -> tuple[list[tuple[str, ...]], np.ndarray]:
+    """
+    Layouts of Specs updated by other Specs, row by row. As when updating a
+    dictionary, the parameters of the first layout keep their places, and the
+    other's new parameters follow.
+    """
+    pairs = layout_ids * len(other_layouts) + other_ids
+    unique_pairs, inverse = np.unique(pairs, return_inverse=True)
+
+    merged = []
+    for pair in unique_pairs.tolist():
+        first, second = divmod(pair, len(other_layouts))
+        keys = layouts[first]
+        merged.append(keys + tuple(k for k in other_layouts[second] if k not in keys))
+
+    return merged, inverse.reshape(len(layout_ids)).astype(np.int64)
+
+
+def _column(values: list[Any], mask: np.ndarray) -> np.ndarray:
+    """
+    Make a column from values, using a native dtype only if all the values present
+    have the same native type, so that values round-trip unchanged.
+    """
+    types = {type(value) for value, present in zip(values, mask) if present}
+
+    for type_, dtype, filler in [
+        (bool, np.bool_, False),
+        (int, np.int64, 0),
+        (float, np.float64, 0.0),
+    ]:
+        if types == {type_}:
+            try:
+                return np.array(
+                    [v if m else filler for v, m in zip(values, mask)], dtype=dtype
+                )
+            except OverflowError:
+                break
+
+    # assign items one at a time, so that list values are not made into dimensions
+    column = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        column[i] = value
+
+    return column
+
+
+def _common_dtype(*columns: np.ndarray) -> list[np.ndarray]:
+    """Cast columns to object dtype unless they all have the same dtype"""
+    if len({column.dtype for column in columns}) == 1:
+        return list(columns)
+    else:
+        return [column.astype(object) for column in columns]
+
+
+def _product(factors: list[ColumnarExperiment]) -> ColumnarExperiment:
+    """Product of columnar Experiments, with the last factor varying fastest"""
+    lens = [len(factor) for factor in factors]
+    n = math.prod(lens)
+
+    columns = {}
+    masks = {}
+    layouts = [()]
+    layout_ids = np.zeros(n, dtype=np.int64)
+    for j, factor in enumerate(factors):
+        # each value repeats once for each combination of the later factors, and
+        # the whole column repeats for each combination of the earlier factors
+        repeats = math.prod(lens[j + 1 :])
+        tiles = math.prod(lens[:j])
+
+        factor_ids = np.tile(np.repeat(factor.layout_ids, repeats), tiles)
+        layouts, layout_ids = _merge_layouts(
+            layouts, layout_ids, factor.layouts, factor_ids
+        )
+
+        for key in factor.columns:
+            column = np.tile(np.repeat(factor.columns[key], repeats), tiles)
+            mask = np.tile(np.repeat(factor.masks[key], repeats), tiles)
+
+            if key in columns:
+                # later factors update earlier ones where they have the parameter
+                old_column, column = _common_dtype(columns[key], column)
+                column = np.where(mask, column, old_column)
+                mask = mask | masks[key]
+
+            columns[key] = column
+            masks[key] = mask
+
+    return ColumnarExperiment(columns, masks, n, layouts, layout_ids)
+
+
+def _union(branches: list[ColumnarExperiment]) -> ColumnarExperiment:
+    """Union of columnar Experiments, concatenating their columns"""
+    keys = list(dict.fromkeys(key for branch in branches for key in branch.columns))
+    n = sum(len(branch) for branch in branches)
+
+    columns = {}
+    masks = {}
+    for key in keys:
+        dtypes = {b.columns[key].dtype for b in branches if key in b.columns}
+        dtype = dtypes.pop() if len(dtypes) == 1 else np.dtype(object)
+
+        column_parts = []
+        mask_parts = []
+        for branch in branches:
+            if key in branch.columns:
+                column_parts.append(branch.columns[key].astype(dtype, copy=False))
+                mask_parts.append(branch.masks[key])
+            else:
+                column_parts.append(np.zeros(len(branch), dtype=dtype))
+                mask_parts.append(np.zeros(len(branch), dtype=bool))
+
+        columns[key] = np.concatenate(column_parts)
+        masks[key] = np.concatenate(mask_parts)
+
+    # renumber each branch's layouts into one list
+    layout_index = {}
+    id_parts = []
+    for branch in branches:
+        renumber = np.array(
+            [layout_index.setdefault(x, len(layout_index)) for x in branch.layouts],
+            dtype=np.int64,
+        )
+        id_parts.append(renumber[branch.layout_ids])
+
+    layout_ids = np.concatenate(id_parts) if id_parts else np.zeros(0, dtype=np.int64)
+    return ColumnarExperiment(columns, masks, n, list(layout_index), layout_ids)
@@ -1,34 +1,911 @@
-from typing import Iterable
+import hashlib
+import itertools
+import json
+import math
+import operator
+import random
+import weakref
+from collections.abc import Mapping
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator
+
+
+class _Layout:
+    """
+    The parameter names of a Spec, in order. Layouts are interned, so all Specs
+    with the same names in the same order share one layout and one name index.
+    Layouts are interned weakly, so a layout is freed once no Spec uses it.
+    """
+
+    __slots__ = ("keys", "index", "_merges", "__weakref__")
+
+    _interned: "weakref.WeakValueDictionary[tuple[str, ...], _Layout]" = (
+        weakref.WeakValueDictionary()
+    )
+
+    # most merges remembered by each layout, so that a long-lived layout (e.g.,
+    # that of the empty Spec) does not keep every layout it was merged with alive
+    _MAX_MERGES = 64
+
+    def __init__(self, keys: tuple[str, ...]):
+        self.keys = keys
+        self.index = {key: i for i, key in enumerate(keys)}
+        self._merges = {}
+
+    @classmethod
+    def of(cls, keys: tuple[str, ...]) -> "_Layout":
+        """The interned layout with these names"""
+        layout = cls._interned.get(keys)
+        if layout is None:
+            layout = cls._interned[keys] = cls(keys)
+
+        return layout
+
+    def merge(
+        self, other: "_Layout"
+    ) -> tuple["_Layout", Callable[[tuple], tuple] | None]:
+        """
+        Layout of a Spec with this layout updated by a Spec with the other layout.
+
+        Returns:
+            tuple[_Layout, Callable | None]: The updated layout, and a function that
+              picks the updated values out of this Spec's values followed by the
+              other Spec's values. If None, the updated values are exactly those
+              concatenated values, as when the layouts have no names in common.
+        """
+        merged = self._merges.get(other)
+        if merged is None:
+            if len(self._merges) >= self._MAX_MERGES:
+                self._merges.clear()
+
+            merged = self._merges[other] = _merge_layouts((self, other))
+
+        return merged
+
+
+def _merge_layouts(
+    layouts: tuple[_Layout, ...],
+) -> tuple[_Layout, Callable[[tuple], tuple] | None]:
+    """
+    Layout of a Spec with each of these layouts updated by the next, and a
+    function that picks the updated values out of all the concatenated values, or
+    None if they are exactly the concatenated values. See `_Layout.merge()`.
+    """
+    keys, picks = _merge_picks(layouts)
+    if picks == list(range(sum(len(layout.keys) for layout in layouts))):
+        pick = None
+    else:
+        pick = _picker(picks)
+
+    return _Layout.of(keys), pick
+
+
+def _merge_picks(layouts: tuple[_Layout, ...]) -> tuple[tuple[str, ...], list[int]]:
+    """
+    Names of a Spec with each of these layouts updated by the next, and the
+    positions of their values in all the concatenated values
+    """
+    # as in updating a dictionary, each name keeps its first place, and takes its
+    # last value
+    positions = {}
+    offset = 0
+    for layout in layouts:
+        for i, key in enumerate(layout.keys):
+            positions[key] = offset + i
+
+        offset += len(layout.keys)
+
+    return tuple(positions), list(positions.values())
+
+
+def _picker(picks: list[int]) -> Callable[[tuple], tuple]:
+    """Function that picks the values at these positions out of a tuple"""
+    if len(picks) == 1:
+        (i,) = picks
+
+        def pick(values: tuple) -> tuple:
+            return (values[i],)
+
+        return pick
+    else:
+        return operator.itemgetter(*picks)
+
+
+class Spec(Mapping):
+    """
+    A Spec is a read-only mapping of parameter names to values.
+
+    Specs are compact: they hold only a tuple of values and a layout of parameter
+    names that is shared by all Specs with the same names. Use `|` to update one
+    Spec with another, and `to_dict()` to convert to a plain dictionary.
+    """
+
+    __slots__ = ("_layout", "_values")
+
+    def __init__(self, mapping: Mapping[str, Any] | Iterable[tuple[str, Any]] = ()):
+        spec = dict(mapping)
+        self._layout = _Layout.of(tuple(spec))
+        self._values = tuple(spec.values())
+
+    @staticmethod
+    def _make(layout: _Layout, values: tuple) -> "Spec":
+        return _make_spec(layout, values)
+
+    @staticmethod
+    def _from_items(keys: tuple[str, ...], values: tuple) -> "Spec":
+        return _make_spec(_Layout.of(keys), values)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to a plain dictionary"""
+        return dict(zip(self._layout.keys, self._values))
+
+    def __getitem__(self, key: str) -> Any:
+        return self._values[self._layout.index[key]]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._layout.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._layout.keys)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Spec) and other._layout is self._layout:
+            return self._values == other._values
+
+        return super().__eq__(other)
+
+    def __or__(self, other: Mapping) -> "Spec":
+        """Update this Spec with another"""
+        if not isinstance(other, Mapping):
+            return NotImplemented
+
+        other = _as_spec(other)
+        layout, pick = self._layout.merge(other._layout)
+        values = self._values + other._values
+        return _make_spec(layout, values if pick is None else pick(values))
+
+    def __ror__(self, other: Mapping) -> "Spec":
+        if not isinstance(other, Mapping):
+            return NotImplemented
+
+        return _as_spec(other) | self
+
+    def __repr__(self) -> str:
+        return f"Spec({self.to_dict()!r})"
+
+    def __reduce__(self):
+        # re-intern the layout when unpickling
+        return (Spec._from_items, (self._layout.keys, self._values))
+
+
+_EMPTY_SPEC = Spec()
+
+
+def _as_spec(spec: Mapping) -> Spec:
+    return spec if isinstance(spec, Spec) else Spec(spec)
+
+
+def _as_dict(spec: Mapping) -> dict:
+    return spec.to_dict() if isinstance(spec, Spec) else dict(spec)
+
+
+def _merge(parts: Iterable[Mapping]) -> Spec:
+    """Update an empty Spec with each of these, in order"""
+    parts = [_as_spec(part) for part in parts]
+    layout, pick = _merge_layouts(tuple(part._layout for part in parts))
+    values = tuple(itertools.chain.from_iterable(part._values for part in parts))
+    return _make_spec(layout, values if pick is None else pick(values))
+
+
+def _make_spec(layout: _Layout, values: tuple, _new=object.__new__) -> Spec:
+    """Make a Spec, without checking or interning anything. See `Spec._make()`."""
+    spec = _new(Spec)
+    spec._layout = layout
+    spec._values = values
+    return spec
+
+
+def _iter_merged(spec_lists: list[list[Spec]]) -> Iterator[Spec]:
+    """
+    Generate the product of these lists of Specs, as `_merge()` would, with the
+    last list varying fastest.
+
+    The merged layout, and an itemgetter that picks the merged values, are found
+    once for each combination of layouts, so each Spec is made with one
+    concatenation of values and one pick, and the loop runs in C.
+    """
+    if any(len(specs) == 0 for specs in spec_lists):
+        return iter(())
+
+    layout_lists = [[spec._layout for spec in specs] for specs in spec_lists]
+    value_lists = [[spec._values for spec in specs] for specs in spec_lists]
+    values = map(
+        tuple, map(itertools.chain.from_iterable, itertools.product(*value_lists))
+    )
+
+    if all(len(set(layouts)) == 1 for layouts in layout_lists):
+        # every combination has the same layout
+        layout, pick = _MERGES[tuple(layouts[0] for layouts in layout_lists)]
+        layouts = itertools.repeat(layout)
+        values = map(pick, values)
+    else:
+        merges = map(_MERGES.__getitem__, itertools.product(*layout_lists))
+        merges, picks = itertools.tee(merges)
+        layouts = map(_FIRST, merges)
+        values = map(_CALL_PICK, map(_SECOND, picks), values)
+
+    return map(_make_spec, layouts, values)
+
+
+def _iter_merged_dicts(spec_lists: list[list[Spec]]) -> Iterator[dict]:
+    """As `_iter_merged()`, but generate plain dictionaries"""
+    # a dictionary made from items keeps each name's first place and last value,
+    # just as merging Specs does
+    item_lists = [
+        [tuple(zip(spec._layout.keys, spec._values)) for spec in specs]
+        for specs in spec_lists
+    ]
+    return map(dict, map(itertools.chain.from_iterable, itertools.product(*item_lists)))
+
+
+_FIRST = operator.itemgetter(0)
+_SECOND = operator.itemgetter(1)
+_CALL_PICK = operator.itemgetter.__call__
+
+
+class _Merges(dict):
+    """
+    Merged layouts of combinations of layouts, each with an itemgetter that
+    picks the merged values as a tuple, found when first looked up
+    """
+
+    # most combinations remembered, so that the layouts they hold are freed
+    MAX_SIZE = 4096
+
+    def __missing__(self, layouts: tuple[_Layout, ...]):
+        if len(self) >= self.MAX_SIZE:
+            self.clear()
+
+        keys, picks = _merge_picks(layouts)
+        if picks == list(range(len(picks))):
+            # the whole tuple, not a copy
+            pick = operator.itemgetter(slice(None))
+        elif len(picks) == 1:
+            pick = operator.itemgetter(slice(picks[0], picks[0] + 1))
+        else:
+            pick = operator.itemgetter(*picks)
+
+        merged = self[layouts] = (_Layout.of(keys), pick)
+        return merged
+
+
+# shared by every product, so that each combination of layouts is merged once
+_MERGES = _Merges()
 
 
 class Experiment:
     """
     An Experiment is set of Specs, supporting union and product operations.
+
+    Experiments are lazy: unions and products are kept as a tree of Experiments,
+    and Specs are only produced when the Experiment is iterated. An Experiment
+    built directly from a list of Specs is a leaf of that tree.
+
+    Experiments store and generate compact, read-only `Spec`s. The `specs`
+    property converts them to plain dictionaries.
     """
 
-    def __init__(self, specs: Iterable[dict]):
-        self.specs = list(specs)
+    def __init__(self, specs: Iterable[dict | Spec]):
+        self._specs = []
+        for spec in specs:
+            assert isinstance(spec, (dict, Spec))
+            self._specs.append(_as_spec(spec))
 
-        for spec in self.specs:
-            assert isinstance(spec, dict)
+    @property
+    def specs(self) -> list[dict]:
+        """All the Specs in this Experiment, expanded into a list of dictionaries"""
+        return list(self._iter_dicts())
 
     def __str__(self) -> str:
-        spec_str = ", ".join(str(spec) for spec in self.specs)
+        spec_str = ", ".join(str(_as_dict(spec)) for spec in self)
         return f"Experiment([{spec_str}])"
 
-    def union(self, other: "Experiment") -> "Experiment":
-        """ "Add" two experiments"""
-        assert isinstance(other, Experiment)
-        return Experiment(self.specs + other.specs)
+    def union(self, *others: "Experiment") -> "Experiment":
+        """ "Add" experiments: the union of this Experiment and any others
+
+        Can also be called as `Experiment.union(x, y, z, ...)`.
+        """
+        return UnionExperiment([self, *others])
+
+    def product(self, *others: "Experiment") -> "Experiment":
+        """ "Multiply" experiments: the product of this Experiment and any others
+
+        Can also be called as `Experiment.product(x, y, z, ...)`.
+        """
+        return ProductExperiment([self, *others])
 
     def __or__(self, other: "Experiment") -> "Experiment":
         return self.union(other)
 
     def __mul__(self, other: "Experiment") -> "Experiment":
-        """ "Multiply" two experiments"""
-        assert isinstance(other, Experiment)
+        return self.product(other)
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    def __iter__(self) -> Iterator[Spec]:
+        return iter(self._specs)
+
+    def __getitem__(self, index: int) -> Spec:
+        """The Spec at this position in the Experiment, without expanding the rest"""
+        return self._specs[_check_index(index, len(self))]
+
+    def shard(self, k: int, n: int, strategy: str = "contiguous") -> Iterator[Spec]:
+        """
+        Generate only the Specs in the k-th of n shards of this Experiment.
+
+        Args:
+            k (int): 0-based index of the shard
+            n (int): number of shards
+            strategy (str): "contiguous" shards are consecutive runs of Specs, so
+              concatenating shards 0, ..., n-1 gives all the Specs in order.
+              "strided" shards take every n-th Spec, starting from the k-th, so
+              interleaving the shards gives all the Specs in order.
+
+        Returns:
+            Iterator[Spec]: Specs in the shard
+        """
+        indices = self.shard_indices(k, n, strategy)
+
+        if strategy == "contiguous":
+            return self._iter_range(indices.start, indices.stop)
+        else:
+            return (self[i] for i in indices)
+
+    def shard_indices(self, k: int, n: int, strategy: str = "contiguous") -> range:
+        """Indices of the Specs in the k-th of n shards. See `shard()`."""
+        if not 0 <= k < n:
+            raise ValueError(f"Shard {k} is not in 0, ..., {n - 1}")
+
+        if strategy == "contiguous":
+            return range(k * len(self) // n, (k + 1) * len(self) // n)
+        elif strategy == "strided":
+            return range(k, len(self), n)
+        else:
+            raise ValueError(f"Unknown shard strategy: {strategy}")
+
+    def sample(self, k: int, seed: Any = None, method: str = "uniform") -> "Experiment":
+        """
+        A random sample of k Specs, in order, decoding only those Specs. See
+        `sample_indices()`.
+        """
+        return Experiment(self[i] for i in self.sample_indices(k, seed, method))
+
+    def sample_indices(
+        self, k: int, seed: Any = None, method: str = "uniform"
+    ) -> list[int]:
+        """Indices of a random sample of k Specs, without expanding the Experiment.
+
+        Args:
+            k (int): number of Specs
+            seed (Any): seed of the random number generator. The same seed gives
+              the same sample.
+            method (str): "uniform" draws k different indices uniformly, so each
+              branch of a union is sampled in proportion to its number of Specs.
+              "latin-hypercube" splits the indices of each product factor into
+              k equal strata and draws one index from each stratum, pairing the
+              strata of different factors at random, so that every factor's
+              values are evenly covered. An Experiment that is not a product is
+              treated as one factor. Specs can repeat only if every factor has
+              fewer than k Specs.
+
+        Returns:
+            list[int]: indices, in increasing order
+        """
+        if not 0 <= k <= len(self):
+            raise ValueError(f"Cannot sample {k} of {len(self)} Specs")
+
+        rng = random.Random(seed)
+        if method == "uniform":
+            indices = rng.sample(range(len(self)), k)
+        elif method == "latin-hypercube":
+            indices = _latin_hypercube(self, k, rng)
+        else:
+            raise ValueError(f"Unknown sampling method: {method}")
+
+        return sorted(indices)
+
+    def spec_ids(self) -> Iterator[str]:
+        """
+        Generate the ID of each Spec, in order. See `spec_id()`.
+        """
+        return map(spec_id, self)
+
+    def iter_batches(self, size: int) -> Iterator[list[Spec]]:
+        """
+        Generate the Specs in lists of `size` Specs (the last list may be shorter),
+        expanding only one list at a time.
+        """
+        if size < 1:
+            raise ValueError(f"Batch size must be positive, not {size}")
+
+        specs = iter(self)
+        # call islice until it returns an empty list
+        return iter(lambda: list(itertools.islice(specs, size)), [])
+
+    async def aiter_batches(
+        self, size: int, thread: bool = False
+    ) -> AsyncIterator[list[Spec]]:
+        """Asynchronously generate the Specs in lists of `size` Specs.
+
+        Args:
+            size (int): number of Specs per list. The last list may be shorter.
+            thread (bool): if True, expand each list in a worker thread, starting
+              on the next list while the current one is being consumed, so that
+              expansion does not block the event loop. Otherwise, expand each list
+              in the event loop, yielding to other tasks between lists.
+
+        Returns:
+            AsyncIterator[list[Spec]]: lists of Specs
+        """
+        import asyncio
 
-        return Experiment([x | y for x in self.specs for y in other.specs])
+        batches = self.iter_batches(size)
 
-    def __iter__(self) -> Iterable[dict]:
-        return iter(self.specs)
+        if not thread:
+            for batch in batches:
+                yield batch
+                await asyncio.sleep(0)
+
+            return
+
+        # expand at most one list ahead of the consumer
+        pending = asyncio.ensure_future(asyncio.to_thread(next, batches, None))
+        try:
+            while (batch := await pending) is not None:
+                pending = asyncio.ensure_future(asyncio.to_thread(next, batches, None))
+                yield batch
+        finally:
+            pending.cancel()
+
+    def where(self, name: str, op: str, value: Any) -> "Experiment":
+        """The Specs whose parameter `name` compares to `value`, in order.
+
+        The filter is pushed down the tree of Experiments: each branch of a union is
+        filtered separately, and a product is filtered by filtering only the factor
+        that determines `name`, so Specs that do not match are never generated and
+        the length of the result is known without expanding it. Only where the
+        tree does not allow this, e.g., if `name` is set by more than one factor of
+        a product, or where the tree has nearly as many nodes as Specs, are the
+        Specs expanded and filtered one by one.
+
+        Args:
+            name (str): parameter name. Specs without this parameter never match.
+            op (str): comparison, one of "==", "!=", "<", "<=", ">", ">=". Values
+              that cannot be compared to `value`, e.g., a string and a number,
+              do not match.
+            value (Any): value to compare to
+
+        Returns:
+            Experiment: the matching Specs
+        """
+        if op not in _COMPARISONS:
+            raise ValueError(f"Unknown comparison: {op}")
+
+        compare = _COMPARISONS[op]
+
+        def test(x: Any) -> bool:
+            try:
+                return bool(compare(x, value))
+            except TypeError:
+                return False
+
+        match, _ = _partition(self, name, test)
+        return match
+
+    def _iter_range(self, start: int, stop: int) -> Iterator[Spec]:
+        """Generate the Specs from index `start` up to, but excluding, `stop`"""
+        return itertools.islice(self._specs, start, stop)
+
+    def _iter_dicts(self) -> Iterator[dict]:
+        """Generate the Specs as plain dictionaries"""
+        return map(_as_dict, self)
+
+
+class ProductExperiment(Experiment):
+    """
+    The product of Experiments. Each Spec is the update of one Spec from each
+    factor, in order, so the last factor varies fastest.
+
+    Nested products are flattened, since the product is associative, and factors
+    that are the product identity (a single, empty Spec) are dropped.
+    """
+
+    def __init__(self, factors: Iterable[Experiment]):
+        self.factors = []
+        for factor in factors:
+            assert isinstance(factor, Experiment)
+            if isinstance(factor, ProductExperiment):
+                self.factors.extend(factor.factors)
+            elif not _is_product_identity(factor):
+                self.factors.append(factor)
+
+        self._len = math.prod(len(factor) for factor in self.factors)
+        self._n_nodes = 1 + sum(_n_nodes(factor) for factor in self.factors)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[Spec]:
+        memo = {}
+        return _iter_merged([_expanded(factor, memo) for factor in self.factors])
+
+    def _iter_dicts(self) -> Iterator[dict]:
+        memo = {}
+        return _iter_merged_dicts([_expanded(factor, memo) for factor in self.factors])
+
+    def __getitem__(self, index: int) -> Spec:
+        # decode the index as a mixed-radix number, with the last factor as the
+        # least significant digit
+        index = _check_index(index, len(self))
+        parts = []
+        for factor in reversed(self.factors):
+            index, digit = divmod(index, len(factor))
+            parts.append(factor[digit])
+
+        return _merge(reversed(parts))
+
+    def _iter_range(self, start: int, stop: int) -> Iterator[Spec]:
+        return _iter_product_range(self.factors, start, stop)
+
+
+class UnionExperiment(Experiment):
+    """
+    The union of Experiments. The Specs of each branch follow one another, in order.
+
+    Nested unions are flattened, since the union is associative, and empty branches
+    are dropped.
+    """
+
+    def __init__(self, branches: Iterable[Experiment]):
+        self.branches = []
+        for branch in branches:
+            assert isinstance(branch, Experiment)
+            if isinstance(branch, UnionExperiment):
+                self.branches.extend(branch.branches)
+            elif len(branch) > 0:
+                self.branches.append(branch)
+
+        self._len = sum(len(branch) for branch in self.branches)
+        self._n_nodes = 1 + sum(_n_nodes(branch) for branch in self.branches)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[Spec]:
+        return itertools.chain.from_iterable(self.branches)
+
+    def _iter_dicts(self) -> Iterator[dict]:
+        return itertools.chain.from_iterable(x._iter_dicts() for x in self.branches)
+
+    def __getitem__(self, index: int) -> Spec:
+        index = _check_index(index, len(self))
+        for branch in self.branches:
+            if index < len(branch):
+                return branch[index]
+
+            index -= len(branch)
+
+        raise AssertionError("unreachable")
+
+    def _iter_range(self, start: int, stop: int) -> Iterator[Spec]:
+        offset = 0
+        for branch in self.branches:
+            if start < offset + len(branch) and stop > offset:
+                yield from branch._iter_range(
+                    max(start - offset, 0), min(stop - offset, len(branch))
+                )
+
+            offset += len(branch)
+
+
+def _expanded(experiment: Experiment, memo: dict[int, list[Spec]]) -> list[Spec]:
+    """
+    All the Specs of an Experiment, in a list that must not be changed. Each node
+    of a tree is expanded once, into `memo`, by id, so a subtree that appears more
+    than once, e.g., a factor shared by the branches of a union, is expanded once.
+    """
+    specs = memo.get(id(experiment))
+    if specs is None:
+        if isinstance(experiment, ProductExperiment):
+            specs = list(_iter_merged([_expanded(x, memo) for x in experiment.factors]))
+        elif isinstance(experiment, UnionExperiment):
+            specs = list(
+                itertools.chain.from_iterable(
+                    _expanded(x, memo) for x in experiment.branches
+                )
+            )
+        else:
+            specs = list(experiment)
+
+        memo[id(experiment)] = specs
+
+    return specs
+
+
+def _iter_product_range(
+    factors: list[Experiment], start: int, stop: int
+) -> Iterator[Spec]:
+    """
+    Generate the Specs of the product of these factors, from index `start` up to,
+    but excluding, `stop`, without generating any Specs outside that range.
+    """
+    # each factor that is used in full is expanded only once
+    memo = {}
+
+    boxes = _product_boxes([len(factor) for factor in factors], start, stop)
+    return itertools.chain.from_iterable(
+        _iter_merged(
+            [
+                list(factors[i]._iter_range(a, b))
+                if (a, b) != (0, len(factors[i]))
+                else _expanded(factors[i], memo)
+                for i, (a, b) in enumerate(box)
+            ]
+        )
+        for box in boxes
+    )
+
+
+def _product_boxes(
+    lens: list[int], start: int, stop: int
+) -> Iterator[list[tuple[int, int]]]:
+    """
+    Split the indices from `start` up to `stop` of a product of factors of these
+    lengths into boxes, in order. Each box is a list of ranges, as (start, stop),
+    one per factor, and the box's Specs are the product of those ranges.
+    """
+    if start >= stop:
+        return
+
+    if not lens:
+        yield []
+        return
+
+    tail_len = math.prod(lens[1:])
+    first = start // tail_len
+    last = (stop - 1) // tail_len
+    full_tail = [(0, n) for n in lens[1:]]
+
+    if first == last:
+        for box in _product_boxes(
+            lens[1:], start - first * tail_len, stop - first * tail_len
+        ):
+            yield [(first, first + 1), *box]
+        return
+
+    # the first row of the tail, if it is partial
+    lo = first
+    if start > first * tail_len:
+        for box in _product_boxes(lens[1:], start - first * tail_len, tail_len):
+            yield [(first, first + 1), *box]
+        lo += 1
+
+    # whole rows of the tail
+    hi = last + 1 if stop == (last + 1) * tail_len else last
+    if lo < hi:
+        yield [(lo, hi), *full_tail]
+
+    # the last row of the tail, if it is partial
+    if hi == last:
+        for box in _product_boxes(lens[1:], 0, stop - last * tail_len):
+            yield [(last, last + 1), *box]
+
+
+def _latin_hypercube(experiment: Experiment, k: int, rng: random.Random) -> list[int]:
+    """Indices of a Latin hypercube sample of k Specs over the product factors"""
+    if isinstance(experiment, ProductExperiment) and experiment.factors:
+        factors = experiment.factors
+    else:
+        factors = [experiment]
+
+    columns = []
+    for factor in factors:
+        n = len(factor)
+        if n >= k:
+            # one index from each of the disjoint strata [s n / k, (s + 1) n / k),
+            # in integers, so no index is drawn twice
+            column = [rng.randrange(s * n // k, (s + 1) * n // k) for s in range(k)]
+        else:
+            # fewer indices than strata, so the strata must overlap
+            column = [(s * n + rng.randrange(n)) // k for s in range(k)]
+        rng.shuffle(column)
+        columns.append(column)
+
+    indices = []
+    for digits in zip(*columns):
+        # encode the factor indices as a mixed-radix number, as in __getitem__
+        index = 0
+        for factor, digit in zip(factors, digits):
+            index = index * len(factor) + digit
+
+        indices.append(index)
+
+    return indices
+
+
+def _is_product_identity(experiment: Experiment) -> bool:
+    """Is this Experiment a single, empty Spec?"""
+    return (
+        type(experiment) is Experiment
+        and len(experiment) == 1
+        and len(experiment._specs[0]) == 0
+    )
+
+
+def _n_nodes(experiment: Experiment) -> int:
+    """Number of nodes in an Experiment tree"""
+    if isinstance(experiment, (ProductExperiment, UnionExperiment)):
+        return experiment._n_nodes
+    else:
+        return 1
+
+
+def _maybe_keys(experiment: Experiment) -> set[str]:
+    """Parameter names that are in at least one Spec of the Experiment"""
+    if isinstance(experiment, ProductExperiment):
+        return set().union(*(_maybe_keys(x) for x in experiment.factors))
+    elif isinstance(experiment, UnionExperiment):
+        return set().union(*(_maybe_keys(x) for x in experiment.branches))
+    else:
+        return set().union(*(spec.keys() for spec in experiment))
+
+
+def _always_keys(experiment: Experiment) -> set[str]:
+    """Parameter names that are in every Spec of the Experiment"""
+    if isinstance(experiment, ProductExperiment):
+        return set().union(*(_always_keys(x) for x in experiment.factors))
+    elif isinstance(experiment, UnionExperiment):
+        branches = [x for x in experiment.branches if len(x) > 0]
+        if not branches:
+            return set()
+
+        return set.intersection(*(_always_keys(x) for x in branches))
+    else:
+        specs = list(experiment)
+        if not specs:
+            return set()
+
+        return set.intersection(*(set(spec) for spec in specs))
+
+
+_COMPARISONS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+# fewest Specs per node of a tree that is partitioned structurally
+_MIN_SPECS_PER_NODE = 8
+
+
+def _partition(
+    experiment: Experiment, name: str, test: Callable[[Any], bool]
+) -> tuple[Experiment, Experiment]:
+    """Split an Experiment into the Specs that pass a test and those that do not.
+
+    The Experiment is partitioned structurally where possible: the partition of a
+    union is the union of the partitions of its branches, and the partition of a
+    product is found by partitioning only the factor that determines the value of
+    `name`. Otherwise, or if the tree has fewer than `_MIN_SPECS_PER_NODE` Specs
+    per node, e.g., after partitioning on many different names, the Specs are
+    filtered in a single pass into lists.
+
+    Args:
+        experiment (Experiment): The Experiment to partition.
+        name (str): The parameter name to test.
+        test (Callable[[Any], bool]): Test of the value of `name`. Specs without
+          `name` do not pass.
+
+    Returns:
+        tuple[Experiment, Experiment]: The passing and failing Experiments, each in
+          the same order as the Specs in `experiment`.
+    """
+    if _n_nodes(experiment) * _MIN_SPECS_PER_NODE > len(experiment):
+        # a tree with nearly as many nodes as Specs is slower to expand than a list
+        # of its Specs, and partitioning it would only add nodes, so it is filtered
+        # into lists
+        pass
+    elif isinstance(experiment, UnionExperiment):
+        parts = [_partition(x, name, test) for x in experiment.branches]
+        return (
+            UnionExperiment(match for match, _ in parts),
+            UnionExperiment(unmatch for _, unmatch in parts),
+        )
+    elif isinstance(experiment, ProductExperiment):
+        factors = experiment.factors
+        having = [i for i, x in enumerate(factors) if name in _maybe_keys(x)]
+
+        if not having:
+            return Experiment([]), experiment
+
+        # the last factor with `name` determines its value, so long as every
+        # Spec in that factor has it. Filtering one factor keeps the product order.
+        j = having[-1]
+        if len(having) == 1 or name in _always_keys(factors[j]):
+            match, unmatch = _partition(factors[j], name, test)
+            return (
+                ProductExperiment([*factors[:j], match, *factors[j + 1 :]]),
+                ProductExperiment([*factors[:j], unmatch, *factors[j + 1 :]]),
+            )
+
+    match_specs = []
+    unmatch_specs = []
+    for spec in experiment:
+        if name in spec and test(spec[name]):
+            match_specs.append(spec)
+        else:
+            unmatch_specs.append(spec)
+
+    return Experiment(match_specs), Experiment(unmatch_specs)
+
+
+def _check_index(index: int, length: int) -> int:
+    """
+    Normalize a (possibly negative) index into an Experiment of this length. Like a
+    sequence index, it can be any integer type, e.g., a NumPy integer, but not a
+    bool.
+    """
+    if isinstance(index, bool):
+        raise TypeError("Experiment indices must be integers, not bool")
+
+    try:
+        index = operator.index(index)
+    except TypeError:
+        raise TypeError(
+            f"Experiment indices must be integers, not {type(index).__name__}"
+        ) from None
+
+    if index < 0:
+        index += length
+
+    if not 0 <= index < length:
+        raise IndexError(f"Experiment index out of range: {index}")
+
+    return index
+
+
+# one encoder, reused for every Spec
+_CANONICAL_ENCODER = json.JSONEncoder(
+    sort_keys=True, separators=(",", ":"), ensure_ascii=True, allow_nan=True
+)
+
+# unlike the canonical encoder, keeps the order of keys at every level
+_ORDERED_ENCODER = json.JSONEncoder(separators=(",", ":"), allow_nan=True)
+
+
+def spec_id(spec: Mapping) -> str:
+    """
+    A stable, content-addressed ID for a Spec.
+
+    The ID is a hash of the Spec's canonical JSON encoding: parameter names are
+    sorted at every level, there is no whitespace, and floats are encoded by their
+    shortest round-trip representation. So the ID does not depend on parameter
+    order or on how a float was written in the griddle (e.g., `1e-3` or `0.001`),
+    and it is the same across processes and Python versions. Integers and floats
+    are distinct (`1` and `1.0` have different IDs).
+
+    Args:
+        spec (Mapping): Spec
+
+    Returns:
+        str: 32-character hexadecimal ID
+    """
+    encoded = _CANONICAL_ENCODER.encode(_as_dict(spec)).encode("ascii")
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
@@ -0,0 +1,133 @@
+"""
+Find the Specs added and removed between two versions of a griddle.
+
+Specs are compared by content (see `griddler.core.spec_id()`), and counted with
+multiplicity, so a Spec that appears twice in the new Experiment but once in the
+old one is added once.
+
+Where the two Experiment trees differ in only one product factor or union branch,
+only that factor or branch is compared, and the added and removed Specs are lazy
+Experiments built from it. So changing one value of one varying parameter in a
+grid of millions of Specs only compares the two versions of that parameter.
+Otherwise, the Specs of the differing subtrees are compared by their IDs.
+"""
+
+from collections import Counter
+
+from griddler.core import (
+    Experiment,
+    ProductExperiment,
+    UnionExperiment,
+    _always_keys,
+    _maybe_keys,
+    spec_id,
+)
+
+
+def diff(old_griddle: dict, new_griddle: dict) -> tuple[Experiment, Experiment]:
+    """Parse two griddles and find the Specs added and removed between them.
+
+    Args:
+        old_griddle (dict): old version of the griddle
+        new_griddle (dict): new version of the griddle
+
+    Returns:
+        tuple[Experiment, Experiment]: the Specs in the new griddle but not the
+          old, and the Specs in the old griddle but not the new
+    """
+    import griddler
+
+    return diff_experiments(griddler.parse(old_griddle), griddler.parse(new_griddle))
+
+
+def diff_experiments(old: Experiment, new: Experiment) -> tuple[Experiment, Experiment]:
+    """Find the Specs added and removed between two Experiments.
+
+    Args:
+        old (Experiment): old Experiment
+        new (Experiment): new Experiment
+
+    Returns:
+        tuple[Experiment, Experiment]: the added Specs, in their order in `new`,
+          and the removed Specs, in their order in `old`
+    """
+    if _same(old, new):
+        return Experiment([]), Experiment([])
+
+    if isinstance(old, ProductExperiment) and isinstance(new, ProductExperiment):
+        j = _only_difference(old.factors, new.factors)
+        if j is not None and _is_visible(old.factors, new.factors, j):
+            added, removed = diff_experiments(old.factors[j], new.factors[j])
+            return (
+                ProductExperiment([*new.factors[:j], added, *new.factors[j + 1 :]]),
+                ProductExperiment([*old.factors[:j], removed, *old.factors[j + 1 :]]),
+            )
+    elif isinstance(old, UnionExperiment) and isinstance(new, UnionExperiment):
+        # the other branches are in both, so they cancel out
+        j = _only_difference(old.branches, new.branches)
+        if j is not None:
+            return diff_experiments(old.branches[j], new.branches[j])
+
+    old_ids = Counter(old.spec_ids())
+    new_ids = Counter(new.spec_ids())
+    return _subtract(new, old_ids), _subtract(old, new_ids)
+
+
+def _subtract(experiment: Experiment, ids: Counter) -> Experiment:
+    """Specs of an Experiment, removing one for each occurrence of its ID in `ids`"""
+    ids = ids.copy()
+    specs = []
+    for spec in experiment:
+        id_ = spec_id(spec)
+        if ids[id_] > 0:
+            ids[id_] -= 1
+        else:
+            specs.append(spec)
+
+    return Experiment(specs)
+
+
+def _only_difference(old: list[Experiment], new: list[Experiment]) -> int | None:
+    """
+    The index of the only child that differs between two lists of children of the
+    same length, or None
+    """
+    if len(old) != len(new):
+        return None
+
+    differences = [i for i, (x, y) in enumerate(zip(old, new)) if not _same(x, y)]
+    return differences[0] if len(differences) == 1 else None
+
+
+def _is_visible(old: list[Experiment], new: list[Experiment], j: int) -> bool:
+    """
+    Can the Specs of the j-th factors always be read from the product's Specs?
+
+    If every Spec of the two j-th factors has the same parameters, and no later
+    factor sets those parameters, then a product Spec made from an added Spec of
+    the j-th factor can never equal one made from a removed Spec, so the products
+    of the added and removed Specs are exactly what is added and removed.
+    """
+    keys = _maybe_keys(old[j]) | _maybe_keys(new[j])
+    if keys != _always_keys(old[j]) or keys != _always_keys(new[j]):
+        return False
+
+    return not any(keys & _maybe_keys(factor) for factor in new[j + 1 :])
+
+
+def _same(x: Experiment, y: Experiment) -> bool:
+    """Are two Experiments the same tree, with the same Specs?"""
+    if x is y:
+        return True
+    elif type(x) is not type(y) or len(x) != len(y):
+        return False
+    elif isinstance(x, ProductExperiment):
+        return len(x.factors) == len(y.factors) and all(
+            _same(a, b) for a, b in zip(x.factors, y.factors)
+        )
+    elif isinstance(x, UnionExperiment):
+        return len(x.branches) == len(y.branches) and all(
+            _same(a, b) for a, b in zip(x.branches, y.branches)
+        )
+    else:
+        return list(x.spec_ids()) == list(y.spec_ids())
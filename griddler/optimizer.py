@@ -0,0 +1,215 @@
+"""
+Optimization of Experiment trees.
+
+Every schema is parsed into the same representation: a tree of `Experiment`
+leaves, `ProductExperiment`s, and `UnionExperiment`s (see `griddler.core`).
+`optimize()` rewrites a tree, from the leaves up, into one with exactly the same
+Specs, in the same order and with their parameters in the same order, by these
+passes:
+
+- "flatten": nested products and unions are flattened, and factors that are the
+  product identity and empty branches are dropped, as the constructors do.
+  Consecutive branches of a union that are leaves are concatenated into one
+  leaf, and a product of one factor or a union of one branch is replaced by its
+  child.
+- "fold": consecutive factors of a product that are single-Spec leaves, e.g.,
+  fixed parameters, are folded into one leaf, a shared baseline, so that each
+  Spec of the product is merged from fewer parts.
+- "hoist": factors common to all the branches of a union are hoisted out of the
+  union. Common last factors are always hoisted; common first factors only if
+  they have a single Spec, since otherwise the order of the Specs would change.
+
+Factors are hoisted before they are folded, so that branches whose first
+factors are the same are not hidden by folding them with different factors.
+
+`explain()` describes a tree, one node per line.
+"""
+
+from typing import Iterable
+
+from griddler.core import (
+    _ORDERED_ENCODER,
+    Experiment,
+    ProductExperiment,
+    UnionExperiment,
+    _as_dict,
+    _maybe_keys,
+    _merge,
+)
+
+PASSES = ["flatten", "fold", "hoist"]
+
+
+def optimize(experiment: Experiment, passes: Iterable[str] = PASSES) -> Experiment:
+    """Rewrite an Experiment tree into a smaller tree with the same Specs.
+
+    Args:
+        experiment (Experiment): Experiment
+        passes (Iterable[str]): which of `PASSES` to run
+
+    Returns:
+        Experiment: the optimized Experiment
+    """
+    passes = set(passes)
+    if bad_passes := passes - set(PASSES):
+        raise ValueError(f"Unknown optimizer passes: {bad_passes}")
+
+    experiment = _optimize(experiment, passes - {"fold"})
+    if "fold" in passes:
+        experiment = _optimize(experiment, passes - {"hoist"})
+
+    return experiment
+
+
+def _optimize(experiment: Experiment, passes: set[str]) -> Experiment:
+    if isinstance(experiment, ProductExperiment):
+        factors = [_optimize(x, passes) for x in experiment.factors]
+        return _optimize_product(ProductExperiment(factors), passes)
+    elif isinstance(experiment, UnionExperiment):
+        branches = [_optimize(x, passes) for x in experiment.branches]
+        return _optimize_union(UnionExperiment(branches), passes)
+    else:
+        return experiment
+
+
+def _optimize_product(product: ProductExperiment, passes: set[str]) -> Experiment:
+    factors = product.factors
+
+    if "fold" in passes:
+        folded = []
+        for factor in factors:
+            if folded and _is_singleton(factor) and _is_singleton(folded[-1]):
+                folded[-1] = Experiment([_merge([folded[-1][0], factor[0]])])
+            else:
+                folded.append(factor)
+
+        if len(folded) < len(factors):
+            product = ProductExperiment(folded)
+            factors = product.factors
+
+    if "flatten" in passes and len(factors) == 1:
+        return factors[0]
+
+    return product
+
+
+def _optimize_union(union: UnionExperiment, passes: set[str]) -> Experiment:
+    branches = union.branches
+
+    if "hoist" in passes and len(branches) > 1:
+        factor_lists = [_factors(x) for x in branches]
+        shortest = min(len(factors) for factors in factor_lists)
+
+        # common first factors, which must have a single Spec
+        n_first = 0
+        while n_first < shortest and _is_singleton(factor_lists[0][n_first]):
+            if not all(
+                _same(factors[n_first], factor_lists[0][n_first])
+                for factors in factor_lists
+            ):
+                break
+            n_first += 1
+
+        # common last factors, not overlapping the first ones
+        n_last = 0
+        while n_first + n_last < shortest:
+            if not all(
+                _same(factors[-1 - n_last], factor_lists[0][-1 - n_last])
+                for factors in factor_lists
+            ):
+                break
+            n_last += 1
+
+        if n_first > 0 or n_last > 0:
+            first = factor_lists[0][:n_first]
+            last = factor_lists[0][len(factor_lists[0]) - n_last :]
+            rests = UnionExperiment(
+                _optimize_product(
+                    ProductExperiment(factors[n_first : len(factors) - n_last]), passes
+                )
+                for factors in factor_lists
+            )
+            rests = _optimize_union(rests, passes)
+            return _optimize_product(ProductExperiment([*first, rests, *last]), passes)
+
+    if "flatten" in passes:
+        concatenated = []
+        for branch in branches:
+            if concatenated and _is_leaf(branch) and _is_leaf(concatenated[-1]):
+                concatenated[-1] = Experiment([*concatenated[-1], *branch])
+            else:
+                concatenated.append(branch)
+
+        if len(concatenated) == 1:
+            return concatenated[0]
+        elif len(concatenated) < len(branches):
+            return UnionExperiment(concatenated)
+
+    return union
+
+
+def _factors(experiment: Experiment) -> list[Experiment]:
+    """Factors of a product, or a one-factor list of any other Experiment"""
+    if isinstance(experiment, ProductExperiment):
+        return experiment.factors
+    else:
+        return [experiment]
+
+
+def _is_leaf(experiment: Experiment) -> bool:
+    """Is this a leaf of Specs in a list, rather than, e.g., a columnar leaf?"""
+    return type(experiment) is Experiment
+
+
+def _is_singleton(experiment: Experiment) -> bool:
+    """Is this a leaf with a single Spec?"""
+    return _is_leaf(experiment) and len(experiment) == 1
+
+
+def _same(x: Experiment, y: Experiment) -> bool:
+    """
+    Are these the same Experiment, or leaves with the same Specs, with their
+    parameters in the same order?
+    """
+    if x is y:
+        return True
+
+    if not _is_leaf(x) or not _is_leaf(y) or len(x) != len(y):
+        return False
+
+    try:
+        return all(
+            _ORDERED_ENCODER.encode(_as_dict(a)) == _ORDERED_ENCODER.encode(_as_dict(b))
+            for a, b in zip(x, y)
+        )
+    except TypeError:
+        # values that are not JSON are never the same
+        return False
+
+
+def explain(experiment: Experiment) -> str:
+    """Describe an Experiment tree, one node per line, indented by depth.
+
+    Each line has the node's type and number of Specs, and each leaf also has the
+    names of its parameters.
+    """
+    return "\n".join(_explain(experiment, 0)) + "\n"
+
+
+def _explain(experiment: Experiment, depth: int) -> Iterable[str]:
+    indent = "  " * depth
+    n = len(experiment)
+    size = f"{n} Spec" if n == 1 else f"{n} Specs"
+
+    if isinstance(experiment, ProductExperiment):
+        yield f"{indent}product: {size}"
+        for factor in experiment.factors:
+            yield from _explain(factor, depth + 1)
+    elif isinstance(experiment, UnionExperiment):
+        yield f"{indent}union: {size}"
+        for branch in experiment.branches:
+            yield from _explain(branch, depth + 1)
+    else:
+        name = "leaf" if _is_leaf(experiment) else type(experiment).__name__
+        keys = ", ".join(sorted(_maybe_keys(experiment)))
+        yield f"{indent}{name}: {size} [{keys}]"
@@ -0,0 +1,150 @@
+"""
+Profile parsing and expanding a griddle.
+
+A profile is a JSON-serializable report of:
+
+- the steps of parsing (e.g., each v0.3 parameter, or each v0.4 product and
+  union), with their wall time, peak traced memory, and the cardinality of the
+  Experiment they produce, and
+- each node of the resulting Experiment tree, with its cardinality and the wall
+  time and peak traced memory of generating all its Specs.
+"""
+
+import contextlib
+import contextvars
+import time
+import tracemalloc
+from typing import Any, Iterator
+
+from griddler.core import Experiment, ProductExperiment, UnionExperiment
+
+# stack of the steps being recorded, innermost last, or None if not profiling
+_steps: contextvars.ContextVar[list[dict] | None] = contextvars.ContextVar(
+    "steps", default=None
+)
+
+
+@contextlib.contextmanager
+def step(name: str) -> Iterator[dict[str, Any]]:
+    """
+    Record a step of parsing, if a profile is being made. Parsers can add a
+    "cardinality" to the yielded record.
+    """
+    stack = _steps.get()
+    record = {"name": name}
+    if stack is None:
+        yield record
+        return
+
+    # resetting the peak loses the enclosing step's peak so far, so save it
+    current, peak = tracemalloc.get_traced_memory()
+    stack[-1]["_peak"] = max(stack[-1]["_peak"], peak)
+    tracemalloc.reset_peak()
+
+    record |= {"_start": current, "_peak": current, "steps": []}
+    stack.append(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["seconds"] = time.perf_counter() - start
+        record["_peak"] = max(record["_peak"], tracemalloc.get_traced_memory()[1])
+        stack.pop()
+        stack[-1]["steps"].append(record)
+        stack[-1]["_peak"] = max(stack[-1]["_peak"], record["_peak"])
+        record["peak_bytes"] = record.pop("_peak") - record.pop("_start")
+
+
+def profile(
+    griddle: dict, max_expand: int | None = None, **kwargs
+) -> tuple[Experiment, dict[str, Any]]:
+    """Parse a griddle, profiling the parse and the expansion of the Experiment.
+
+    Every node of the Experiment tree is expanded separately, so profiling takes
+    longer than expanding the Experiment once.
+
+    Args:
+        griddle (dict): griddle
+        max_expand (int | None): do not expand nodes with more than this many
+          Specs. Their cardinality is still reported.
+        **kwargs: passed to `griddler.parse()`
+
+    Returns:
+        tuple[Experiment, dict]: the Experiment, and the profile
+    """
+    import griddler
+
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+
+    try:
+        top = {"_peak": 0, "steps": []}
+        token = _steps.set([top])
+        try:
+            with step("parse") as record:
+                experiment = griddler.parse(griddle, **kwargs)
+                record["cardinality"] = len(experiment)
+        finally:
+            _steps.reset(token)
+
+        report = {
+            "parse": top["steps"][0],
+            "experiment": profile_experiment(experiment, max_expand=max_expand),
+        }
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    return experiment, report
+
+
+def profile_experiment(
+    experiment: Experiment, max_expand: int | None = None
+) -> dict[str, Any]:
+    """Profile expanding each node of an Experiment tree.
+
+    Args:
+        experiment (Experiment): Experiment
+        max_expand (int | None): do not expand nodes with more than this many
+          Specs. Their "seconds" and "peak_bytes" are None.
+
+    Returns:
+        dict: report with the node type, cardinality, expansion wall time and
+          peak traced memory, and the reports of any child nodes
+    """
+    if isinstance(experiment, ProductExperiment):
+        children = experiment.factors
+    elif isinstance(experiment, UnionExperiment):
+        children = experiment.branches
+    else:
+        children = []
+
+    report = {
+        "node": type(experiment).__name__,
+        "cardinality": len(experiment),
+        "seconds": None,
+        "peak_bytes": None,
+    }
+
+    if max_expand is None or len(experiment) <= max_expand:
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+
+        tracemalloc.reset_peak()
+        start_bytes = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        for _ in experiment:
+            pass
+
+        report["seconds"] = time.perf_counter() - start
+        report["peak_bytes"] = tracemalloc.get_traced_memory()[1] - start_bytes
+
+        if not was_tracing:
+            tracemalloc.stop()
+
+    if children:
+        report["children"] = [profile_experiment(x, max_expand) for x in children]
+
+    return report
@@ -1,7 +1,10 @@
-import itertools
+import concurrent.futures
+import math
 from collections.abc import Iterable
+from typing import Any
 
 from griddler.core import Experiment
+from griddler.profiling import step
 
 
 def _validate(griddle: dict) -> None:
@@ -28,31 +31,44 @@ def _validate(griddle: dict) -> None:
     )
 
 
-def parse(griddle: dict) -> Experiment:
+def count(griddle: dict) -> int:
+    """
+    Count the parameter sets in a griddle, without expanding it. Nests do not
+    change the count, so they are not matched.
+    """
     _validate(griddle)
 
-    # start with the grid, and if there is no grid, consider the grid empty
     if "grid_parameters" in griddle:
-        param_sets = [
-            dict(zip(griddle["grid_parameters"].keys(), values))
-            for values in itertools.product(*griddle["grid_parameters"].values())
-        ]
+        return math.prod(len(values) for values in griddle["grid_parameters"].values())
     else:
-        param_sets = [{}]
+        return 1
 
-    # merge in baseline values, if present
-    if "baseline_parameters" in griddle:
-        param_sets = [ps | griddle["baseline_parameters"] for ps in param_sets]
 
-    # find where nested values will get merged, if they are present
-    if "nested_parameters" in griddle:
+def parse(griddle: dict, workers: int = 1) -> Experiment:
+    _validate(griddle)
+
+    # only nests need the grid to be expanded as it is parsed
+    if workers > 1 and "nested_parameters" in griddle:
+        return _parse_parallel(griddle, workers)
+
+    # without nests, the grid and baseline are a lazy product
+    grid = _grid(griddle)
+    if "nested_parameters" not in griddle:
+        return grid
+
+    with step("grid_parameters"):
+        param_sets = grid.specs
+
+    # merge each nest into the parameter sets that it matches
+    with step("nested_parameters"):
         nests = griddle["nested_parameters"]
+        index = _NestIndex(nests)
         unmatched_nest_idx = set(range(len(nests)))
         for ps in param_sets:
-            m = _get_match(ps, nests)
+            m = _get_match(ps, nests, index)
             if m is not None:
                 ps |= nests[m]
-                unmatched_nest_idx -= {m}
+                unmatched_nest_idx.discard(m)
 
         if unmatched_nest_idx:
             raise RuntimeError(
@@ -63,19 +79,131 @@ def parse(griddle: dict) -> Experiment:
     return Experiment(param_sets)
 
 
-def _get_match(param_set: dict, nests: Iterable[dict]) -> int | None:
+def _parse_parallel(griddle: dict, workers: int) -> Experiment:
+    """
+    Expand the grid, merge in the baseline, and match the nests in a pool of
+    processes, each taking a contiguous range of the grid.
+    """
+    n = count(griddle)
+    bounds = [(k * n // workers, (k + 1) * n // workers) for k in range(workers)]
+
+    with step("grid_parameters"):
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(
+                executor.map(
+                    _expand_range,
+                    [griddle] * workers,
+                    [start for start, _ in bounds],
+                    [stop for _, stop in bounds],
+                )
+            )
+
+    param_sets = [ps for chunk, _ in results for ps in chunk]
+
+    if "nested_parameters" in griddle:
+        nests = griddle["nested_parameters"]
+        matched = set().union(*(matched for _, matched in results))
+        if unmatched_nest_idx := set(range(len(nests))) - matched:
+            raise RuntimeError(
+                "Nests do not match any parameter sets: ",
+                *[nests[i] for i in unmatched_nest_idx],
+            )
+
+    return Experiment(param_sets)
+
+
+def _expand_range(griddle: dict, start: int, stop: int) -> tuple[list[dict], set[int]]:
+    """
+    Make the parameter sets from `start` up to `stop` in the grid, and find which
+    nests they match
+    """
+    param_sets = [dict(spec) for spec in _grid(griddle)._iter_range(start, stop)]
+
+    matched = set()
+    if "nested_parameters" in griddle:
+        nests = griddle["nested_parameters"]
+        index = _NestIndex(nests)
+        for ps in param_sets:
+            m = _get_match(ps, nests, index)
+            if m is not None:
+                ps |= nests[m]
+                matched.add(m)
+
+    return param_sets, matched
+
+
+def _grid(griddle: dict) -> Experiment:
+    """
+    The product of each grid parameter, updated by the baseline. Without a grid,
+    just the baseline.
+    """
+    return Experiment.product(
+        *[
+            Experiment([{key: value} for value in values])
+            for key, values in griddle.get("grid_parameters", {}).items()
+        ],
+        Experiment([griddle.get("baseline_parameters", {})]),
+    )
+
+
+class _NestIndex:
+    """
+    Inverted index from parameter name-value pairs to the nests that have them.
+    Unhashable values (e.g., lists) cannot be indexed, so they are compared one
+    by one.
+    """
+
+    def __init__(self, nests: Iterable[dict]):
+        self.hashable: dict[tuple[str, Any], set[int]] = {}
+        self.unhashable: dict[str, list[tuple[Any, int]]] = {}
+
+        for i, nest in enumerate(nests):
+            for key, value in nest.items():
+                try:
+                    self.hashable.setdefault((key, value), set()).add(i)
+                except TypeError:
+                    self.unhashable.setdefault(key, []).append((value, i))
+
+    def matches(self, param_set: dict) -> set[int]:
+        """Indices of the nests that match this parameter set"""
+        matches = set()
+        for key, value in param_set.items():
+            try:
+                matches.update(self.hashable.get((key, value), ()))
+            except TypeError:
+                pass
+
+            for nest_value, i in self.unhashable.get(key, ()):
+                if nest_value == value:
+                    matches.add(i)
+
+        return matches
+
+
+def _get_match(
+    param_set: dict, nests: Iterable[dict], index: _NestIndex | None = None
+) -> int | None:
     """
     Which nest(s) does this parameter set (i.e., Spec) match to?
 
+    Args:
+        param_set (dict): parameter set
+        nests (Iterable[dict]): nests
+        index (_NestIndex | None): index of the nests. If None, it is built from
+          the nests, so pass an index when matching many parameter sets.
+
     Returns: Index of the matching nest, or None if no match.
     """
-    matches = [_is_match(param_set, nest) for nest in nests]
+    if index is None:
+        index = _NestIndex(nests)
+
+    matches = index.matches(param_set)
 
-    match matches.count(True):
+    match len(matches):
         case 0:
             return None
         case 1:
-            return matches.index(True)
+            return matches.pop()
         case _:
             raise RuntimeError(f"Parameter set {param_set} matches multiple of {nests}")
 
@@ -1,10 +1,16 @@
+import functools
 import importlib.resources
 import json
+from collections import Counter
 from typing import Any
 
 import jsonschema
+import jsonschema.exceptions
+import jsonschema.validators
 
 from griddler.core import Experiment
+from griddler.core import _partition as _partition_by
+from griddler.profiling import step
 
 
 def load_schema() -> dict:
@@ -19,8 +25,29 @@ def load_schema() -> dict:
     return schema
 
 
+@functools.cache
+def _validator() -> jsonschema.protocols.Validator:
+    """Compile the griddle schema into a validator, once per process"""
+    schema = load_schema()
+    validator_class = jsonschema.validators.validator_for(schema)
+    validator_class.check_schema(schema)
+    return validator_class(schema)
+
+
+def validate(griddle: dict) -> None:
+    """Validate a griddle against the schema.
+
+    Raises:
+        jsonschema.exceptions.ValidationError: if the griddle is invalid
+    """
+    error = jsonschema.exceptions.best_match(_validator().iter_errors(griddle))
+    if error is not None:
+        raise error
+
+
 def parse(griddle: dict) -> Experiment:
-    jsonschema.validate(instance=griddle, schema=load_schema())
+    with step("validate"):
+        validate(griddle)
 
     # confirm we are in the right schema
     assert griddle["schema"] == "v0.3"
@@ -29,65 +56,154 @@ def parse(griddle: dict) -> Experiment:
     return _parse_parameters(griddle["parameters"])
 
 
-def _parse_parameters(parameters: dict[str, Any]) -> Experiment:
+def count(griddle: dict) -> int:
+    """Count the Specs in a griddle, without expanding it.
+
+    Only the parameters named in conditions can change how many Specs later
+    parameters add, so this tracks how many Specs have each combination of values
+    of those parameters, rather than the Specs themselves.
+    """
+    validate(griddle)
+    assert griddle["schema"] == "v0.3"
+    assert "parameters" in griddle, 'v0.3 griddle must have an "parameters" key'
+
+    parameters = [
+        (name, *_parameter_experiment(name, value))
+        for name, value in _ordered_parameters(griddle["parameters"])
+    ]
+    conditions = [
+        _compile_condition(condition) for _, _, condition in parameters if condition
+    ]
+    keys = list(dict.fromkeys(if_name for if_name, _ in conditions))
+
+    counts = Counter({_signature({}, keys): 1})
+    for _, experiment, condition in parameters:
+        if condition:
+            if_name, if_value = _compile_condition(condition)
+            position = keys.index(if_name)
+            if_value = _freeze(if_value)
+        else:
+            position = None
+
+        right_counts = Counter(_signature(spec, keys) for spec in experiment)
+        new_counts = Counter()
+        for signature, n in counts.items():
+            if position is not None and signature[position] != if_value:
+                # Specs that do not match are unchanged
+                new_counts[signature] += n
+                continue
+
+            for right_signature, m in right_counts.items():
+                merged = tuple(
+                    old if new is _MISSING else new
+                    for old, new in zip(signature, right_signature)
+                )
+                new_counts[merged] += n * m
+
+        counts = new_counts
+
+    return sum(counts.values())
+
+
+# placeholder in a signature for a parameter that a Spec does not have
+_MISSING = object()
+
+
+def _signature(spec: dict, keys: list[str]) -> tuple:
+    """Hashable values of these parameters in a Spec"""
+    return tuple(_freeze(spec[key]) if key in spec else _MISSING for key in keys)
+
+
+def _freeze(value: Any) -> Any:
+    """Make a parameter value hashable, keeping which values are equal"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(x) for x in value)
+    elif isinstance(value, dict):
+        return frozenset((k, _freeze(v)) for k, v in value.items())
+    else:
+        return value
+
+
+def _ordered_parameters(parameters: dict[str, Any]) -> list[tuple[str, Any]]:
+    """Parameters in the order they are added: independent, then dependent"""
     # determine which parameters are dependent
     dependent_keys = [key for key, value in parameters.items() if "if" in value]
-    independent_keys = list(set(parameters.keys()) - set(dependent_keys))
+    # in griddle order, so that the order of the Specs does not vary between runs
+    independent_keys = [key for key in parameters if key not in dependent_keys]
+
+    return [(key, parameters[key]) for key in independent_keys + dependent_keys]
 
+
+def _parse_parameters(parameters: dict[str, Any]) -> Experiment:
     # start with an experiment with an empty Spec
     ex = Experiment([dict()])
 
     # call everything a bundle at first
-    for bundle_name in independent_keys + dependent_keys:
-        bundle_value = parameters[bundle_name]
-        assert isinstance(bundle_value, dict)
+    for bundle_name, bundle_value in _ordered_parameters(parameters):
+        with step(f"parameter {bundle_name}") as record:
+            ex = _parse_parameter(ex, bundle_name, bundle_value)
+            record["cardinality"] = len(ex)
 
-        if "if" in bundle_value:
-            condition = bundle_value["if"]
-        else:
-            condition = {}
+    return ex
 
-        if "fix" in bundle_value:
-            if bad_names := set(bundle_value.keys()) - {"fix", "if", "comment"}:
-                raise RuntimeError(
-                    f"Fixed parameter '{bundle_name}' has impermissible keys: {bad_names}"
-                )
 
-            fix_ex = Experiment([{bundle_name: bundle_value["fix"]}])
-            ex = _conditional_product(ex, fix_ex, condition)
-        elif "vary" in bundle_value:
-            if bad_names := set(bundle_value.keys()) - {"vary", "if", "comment"}:
-                raise RuntimeError(
-                    f"Varying parameter '{bundle_name}' has impermissible keys: {bad_names}"
-                )
+def _parse_parameter(ex: Experiment, bundle_name: str, bundle_value: Any) -> Experiment:
+    """Add one fixed, varying, or bundled parameter to an Experiment"""
+    right, condition = _parameter_experiment(bundle_name, bundle_value)
+    return _conditional_product(ex, right, condition)
 
-            vary_ex = Experiment([{bundle_name: x} for x in bundle_value["vary"]])
-            ex = _conditional_product(ex, vary_ex, condition)
-        else:
-            # this is a bundle
-            if bad_names := set(bundle_value.keys()).intersection(
-                ["if", "fix", "vary", "comment"]
-            ):
-                raise RuntimeError(
-                    f"Bundle '{bundle_name}' has impermissible parameter names: {bad_names}"
-                )
 
-            # check that all values in the bundle have the same length
-            lens = [len(x) for x in bundle_value.values()]
-            assert len(set(lens)) == 1, "All bundle values must have the same length"
-            bundle_len = lens[0]
-
-            # make an experiment where each Spec has each parameter, and all the values
-            # of those parameters are matched within the Spec
-            bundle_ex = Experiment(
-                [
-                    {k: bundle_value[k][i] for k in bundle_value.keys()}
-                    for i in range(bundle_len)
-                ]
+def _parameter_experiment(
+    bundle_name: str, bundle_value: Any
+) -> tuple[Experiment, dict[str, Any]]:
+    """
+    Make the Experiment of one fixed, varying, or bundled parameter, and get the
+    condition (possibly empty) under which it is added
+    """
+    assert isinstance(bundle_value, dict)
+
+    if "if" in bundle_value:
+        condition = bundle_value["if"]
+    else:
+        condition = {}
+
+    if "fix" in bundle_value:
+        if bad_names := set(bundle_value.keys()) - {"fix", "if", "comment"}:
+            raise RuntimeError(
+                f"Fixed parameter '{bundle_name}' has impermissible keys: {bad_names}"
             )
-            ex *= bundle_ex
 
-    return ex
+        return Experiment([{bundle_name: bundle_value["fix"]}]), condition
+    elif "vary" in bundle_value:
+        if bad_names := set(bundle_value.keys()) - {"vary", "if", "comment"}:
+            raise RuntimeError(
+                f"Varying parameter '{bundle_name}' has impermissible keys: {bad_names}"
+            )
+
+        return Experiment([{bundle_name: x} for x in bundle_value["vary"]]), condition
+    else:
+        # this is a bundle
+        if bad_names := set(bundle_value.keys()).intersection(
+            ["if", "fix", "vary", "comment"]
+        ):
+            raise RuntimeError(
+                f"Bundle '{bundle_name}' has impermissible parameter names: {bad_names}"
+            )
+
+        # check that all values in the bundle have the same length
+        lens = [len(x) for x in bundle_value.values()]
+        assert len(set(lens)) == 1, "All bundle values must have the same length"
+        bundle_len = lens[0]
+
+        # make an experiment where each Spec has each parameter, and all the values
+        # of those parameters are matched within the Spec
+        bundle_ex = Experiment(
+            [
+                {k: bundle_value[k][i] for k in bundle_value.keys()}
+                for i in range(bundle_len)
+            ]
+        )
+        return bundle_ex, condition
 
 
 def _conditional_product(
@@ -105,27 +221,27 @@ def _conditional_product(
     """
     if condition == {}:
         return left * right
-    else:
-        # filter the left Experiment based on the condition
-        match_left = Experiment(
-            [spec for spec in left.specs if _if_match(spec, condition)]
-        )
-        unmatch_left = Experiment(
-            [spec for spec in left.specs if not _if_match(spec, condition)]
-        )
 
+    if_name, if_value = _compile_condition(condition)
+    match_left, unmatch_left = _partition(left, if_name, if_value)
+
+    # Specs that do not match are not rebuilt
+    if len(match_left) == 0:
+        return left
+    elif len(unmatch_left) == 0:
+        return match_left * right
+    else:
         return (match_left * right) | unmatch_left
 
 
-def _if_match(spec: dict[str, Any], condition: dict[str, Any]) -> bool:
-    """Check if a Spec matches a condition.
+def _compile_condition(condition: dict[str, Any]) -> tuple[str, Any]:
+    """Check a condition, and extract the name and value that Specs must match.
 
     Args:
-        spec (dict[str, Any]): The Spec to check.
-        condition (dict[str, Any]): The condition to match against.
+        condition (dict[str, Any]): The condition, like `{"equals": {name: value}}`.
 
     Returns:
-        bool: True if the Spec matches the condition, False otherwise.
+        tuple[str, Any]: The name and value.
     """
     assert isinstance(condition, dict), "Condition must be a dictionary"
     assert "equals" in condition, "Only 'equals' conditions are supported"
@@ -133,7 +249,21 @@ def _if_match(spec: dict[str, Any], condition: dict[str, Any]) -> bool:
         "Only one key is allowed in 'equals' condition"
     )
 
-    if_name = list(condition["equals"].keys())[0]
-    if_value = condition["equals"][if_name]
+    return next(iter(condition["equals"].items()))
+
 
-    return if_name in spec and spec[if_name] == if_value
+def _partition(
+    experiment: Experiment, if_name: str, if_value: Any
+) -> tuple[Experiment, Experiment]:
+    """Split an Experiment into the Specs that match a condition and those that do not.
+
+    Args:
+        experiment (Experiment): The Experiment to partition.
+        if_name (str): The parameter name in the condition.
+        if_value (Any): The value that matching Specs have for `if_name`.
+
+    Returns:
+        tuple[Experiment, Experiment]: The matching and non-matching Experiments,
+          each in the same order as the Specs in `experiment`.
+    """
+    return _partition_by(experiment, if_name, lambda x: x == if_value)
@@ -1,11 +1,15 @@
 import functools
 import importlib.resources
 import json
+import math
 from typing import Any
 
 import jsonschema
+import jsonschema.exceptions
+import jsonschema.validators
 
 from griddler.core import Experiment
+from griddler.profiling import step
 
 
 def load_schema() -> dict:
@@ -20,8 +24,29 @@ def load_schema() -> dict:
     return schema
 
 
+@functools.cache
+def _validator() -> jsonschema.protocols.Validator:
+    """Compile the griddle schema into a validator, once per process"""
+    schema = load_schema()
+    validator_class = jsonschema.validators.validator_for(schema)
+    validator_class.check_schema(schema)
+    return validator_class(schema)
+
+
+def validate(griddle: dict) -> None:
+    """Validate a griddle against the schema.
+
+    Raises:
+        jsonschema.exceptions.ValidationError: if the griddle is invalid
+    """
+    error = jsonschema.exceptions.best_match(_validator().iter_errors(griddle))
+    if error is not None:
+        raise error
+
+
 def parse(griddle: dict) -> Experiment:
-    jsonschema.validate(instance=griddle, schema=load_schema())
+    with step("validate"):
+        validate(griddle)
 
     # confirm we are in the right schema
     assert griddle["schema"] == "v0.4"
@@ -30,19 +55,52 @@ def parse(griddle: dict) -> Experiment:
     return _parse_experiment(griddle["experiment"])
 
 
-def _parse_experiment(x: list[dict[str, Any]] | dict[str, Any]) -> Experiment:
+def count(griddle: dict) -> int:
+    """Count the Specs in a griddle, without making any Specs"""
+    validate(griddle)
+    assert griddle["schema"] == "v0.4"
+    assert "experiment" in griddle, 'v0.4 griddle must have an "experiment" key'
+
+    return _count_experiment(griddle["experiment"])
+
+
+def _count_experiment(x: list[dict[str, Any]] | dict[str, Any]) -> int:
     if isinstance(x, list):
-        return Experiment(x)
+        return len(x)
     elif isinstance(x, dict):
         assert len(x) == 1
         key, value = list(x.items())[0]
         assert isinstance(value, list)
-        subexperiments = [_parse_experiment(elt) for elt in value]
+        counts = [_count_experiment(elt) for elt in value]
         if key == "union":
-            return functools.reduce(lambda x, y: x | y, subexperiments)
+            return sum(counts)
         elif key == "product":
-            return functools.reduce(lambda x, y: x * y, subexperiments)
+            return math.prod(counts)
         else:
             raise RuntimeError(f"Unknown experiment key: {key}")
     else:
         raise RuntimeError(f"Unknown experiment type: {x} of type {type(x)}")
+
+
+def _parse_experiment(x: list[dict[str, Any]] | dict[str, Any]) -> Experiment:
+    if isinstance(x, list):
+        return Experiment(x)
+    elif isinstance(x, dict):
+        assert len(x) == 1
+        key, value = list(x.items())[0]
+        assert isinstance(value, list)
+        with step(key) as record:
+            subexperiments = [_parse_experiment(elt) for elt in value]
+            # start from the identity, so that empty lists are allowed
+            if key == "union":
+                experiment = Experiment.union(Experiment([]), *subexperiments)
+            elif key == "product":
+                experiment = Experiment.product(Experiment([{}]), *subexperiments)
+            else:
+                raise RuntimeError(f"Unknown experiment key: {key}")
+
+            record["cardinality"] = len(experiment)
+
+        return experiment
+    else:
+        raise RuntimeError(f"Unknown experiment type: {x} of type {type(x)}")
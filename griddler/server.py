@@ -0,0 +1,280 @@
+"""
+A local server that keeps parsed Experiments in memory and answers requests for
+their Specs, so that many processes can share one parse of a griddle.
+
+The server speaks HTTP, on a Unix socket or on a localhost port. Each request is
+a POST to `/count`, `/spec`, or `/range`, with a JSON body that names the
+Experiment, either by its griddle (`{"griddle": {...}}`) or, once the server has
+it, by the griddle's ID (`{"id": "..."}`, see `griddler.cache.key()`). The ID
+keeps the order of the griddle's keys, so griddles that differ only in order,
+and so in the order of their Specs, are different Experiments:
+
+- `/count` answers `{"id": ..., "count": n}`
+- `/spec` with `"index": i` answers `{"id": ..., "spec": {...}}`
+- `/range` with `"start": a, "stop": b` answers `{"id": ..., "specs": [...]}`,
+  the Specs from index a up to, but excluding, b
+
+Errors answer `{"error": "..."}`, with status 404 if the ID is unknown, and
+status 400 otherwise.
+
+`Client` talks to a running server. `LocalClient` answers the same requests in
+the calling process, without a server, e.g., for tests.
+"""
+
+import collections
+import http.client
+import http.server
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+from typing import Any
+
+import griddler
+import griddler.cache
+from griddler.core import Experiment, _as_dict, _check_index
+
+# number of Experiments kept in memory; the least recently used are dropped
+MAX_EXPERIMENTS = 128
+
+# most Specs answered by one range request
+MAX_RANGE = 100_000
+
+OPERATIONS = ["count", "spec", "range"]
+
+
+class UnknownExperimentError(KeyError):
+    """The server does not have an Experiment with this ID"""
+
+
+class Service:
+    """Parsed Experiments, and the answers to requests about them"""
+
+    def __init__(self, max_experiments: int = MAX_EXPERIMENTS):
+        self.max_experiments = max_experiments
+        self._experiments: collections.OrderedDict[str, Experiment] = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def answer(self, operation: str, request: dict[str, Any]) -> tuple[int, dict]:
+        """Answer a request, turning errors into answers.
+
+        Returns:
+            tuple[int, dict]: HTTP status, and the answer
+        """
+        try:
+            return 200, self.handle(operation, request)
+        except UnknownExperimentError as e:
+            return 404, {"error": f"Unknown experiment: {e.args[0]}"}
+        except Exception as e:
+            return 400, {"error": f"{type(e).__name__}: {e}"}
+
+    def handle(self, operation: str, request: dict[str, Any]) -> dict[str, Any]:
+        """Answer a request.
+
+        Args:
+            operation (str): one of `OPERATIONS`
+            request (dict): the request body
+
+        Returns:
+            dict: the answer
+        """
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown operation: {operation}")
+
+        id_, experiment = self._experiment(request)
+
+        if operation == "count":
+            return {"id": id_, "count": len(experiment)}
+        elif operation == "spec":
+            index = _check_index(request["index"], len(experiment))
+            return {"id": id_, "spec": _as_dict(experiment[index])}
+        else:
+            start, stop, _ = slice(request["start"], request["stop"]).indices(
+                len(experiment)
+            )
+            if stop - start > MAX_RANGE:
+                raise ValueError(f"Range has more than {MAX_RANGE} Specs")
+
+            specs = experiment._iter_range(start, max(start, stop))
+            return {"id": id_, "specs": [_as_dict(spec) for spec in specs]}
+
+    def _experiment(self, request: dict[str, Any]) -> tuple[str, Experiment]:
+        """Find, or parse and keep, the Experiment that a request names"""
+        if "griddle" in request:
+            id_ = griddler.cache.key(request["griddle"])
+        elif "id" in request:
+            id_ = request["id"]
+        else:
+            raise ValueError('Request must have a "griddle" or an "id"')
+
+        with self._lock:
+            if id_ in self._experiments:
+                self._experiments.move_to_end(id_)
+                return id_, self._experiments[id_]
+
+        if "griddle" not in request:
+            raise UnknownExperimentError(id_)
+
+        experiment = griddler.parse(request["griddle"])
+
+        with self._lock:
+            self._experiments[id_] = experiment
+            while len(self._experiments) > self.max_experiments:
+                self._experiments.popitem(last=False)
+
+        return id_, experiment
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    service: Service
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length))
+        except ValueError as e:
+            status, answer = 400, {"error": f"Request is not JSON: {e}"}
+        else:
+            status, answer = self.service.answer(self.path.strip("/"), request)
+
+        body = json.dumps(answer).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        # Unix socket clients have no host
+        return self.client_address[0] if self.client_address else "local"
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(
+    socket_path: str | None = None,
+    port: int | None = None,
+    service: Service | None = None,
+) -> socketserver.BaseServer:
+    """Make a server on a Unix socket or a localhost port.
+
+    Args:
+        socket_path (str | None): path of a Unix socket to listen on
+        port (int | None): localhost port to listen on, if there is no
+          `socket_path`. 0 picks a free port.
+        service (Service | None): the Experiments to serve. If None, start empty.
+
+    Returns:
+        socketserver.BaseServer: the server. Call `serve_forever()` to start it.
+    """
+    handler = type("Handler", (_Handler,), {"service": service or Service()})
+
+    if socket_path is not None:
+        # remove a socket left by an earlier server, but never any other file
+        if os.path.exists(socket_path) and stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            os.unlink(socket_path)
+
+        return _UnixHTTPServer(socket_path, handler)
+    elif port is not None:
+        return http.server.ThreadingHTTPServer(("127.0.0.1", port), handler)
+    else:
+        raise ValueError("Server needs a socket path or a port")
+
+
+class LocalClient:
+    """
+    Requests to a service in this process, without a server. `Client` makes the
+    same requests to a server.
+    """
+
+    def __init__(self, service: Service | None = None):
+        self.service = service or Service()
+
+    def count(self, griddle: dict) -> int:
+        """Number of Specs in a griddle's Experiment"""
+        return self._request("count", griddle, {})["count"]
+
+    def spec(self, griddle: dict, index: int) -> dict:
+        """The Spec at this index"""
+        return self._request("spec", griddle, {"index": index})["spec"]
+
+    def range(self, griddle: dict, start: int, stop: int) -> list[dict]:
+        """The Specs from `start` up to, but excluding, `stop`"""
+        return self._request("range", griddle, {"start": start, "stop": stop})["specs"]
+
+    def _request(self, operation: str, griddle: dict, request: dict) -> dict:
+        """
+        Make a request by the griddle's ID, sending the whole griddle only if the
+        service does not have it yet
+        """
+        try:
+            return self._send(operation, {"id": griddler.cache.key(griddle), **request})
+        except UnknownExperimentError:
+            return self._send(operation, {"griddle": griddle, **request})
+
+    def _send(self, operation: str, request: dict) -> dict:
+        status, answer = self.service.answer(operation, request)
+        # answer exactly what a server would
+        return _check(status, json.loads(json.dumps(answer)), request)
+
+
+class Client(LocalClient):
+    """Requests to a server on a Unix socket or a localhost port"""
+
+    def __init__(self, socket_path: str | None = None, port: int | None = None):
+        if socket_path is None and port is None:
+            raise ValueError("Client needs a socket path or a port")
+
+        self.socket_path = socket_path
+        self.port = port
+
+    def _send(self, operation: str, request: dict) -> dict:
+        if self.socket_path is not None:
+            connection = _UnixHTTPConnection(self.socket_path)
+        else:
+            connection = http.client.HTTPConnection("127.0.0.1", self.port)
+
+        try:
+            connection.request(
+                "POST",
+                f"/{operation}",
+                body=json.dumps(request),
+                headers={"Content-Type": "application/json"},
+            )
+            response = connection.getresponse()
+            answer = json.loads(response.read())
+        finally:
+            connection.close()
+
+        return _check(response.status, answer, request)
+
+
+def _check(status: int, answer: dict, request: dict) -> dict:
+    """Raise an error for an error answer"""
+    if status == 404:
+        raise UnknownExperimentError(request.get("id"))
+    elif status != 200:
+        raise RuntimeError(answer["error"])
+
+    return answer
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix socket"""
+
+    def __init__(self, socket_path: str):
+        super().__init__("localhost")
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
@@ -0,0 +1,239 @@
+"""
+A binary file of Specs that can be memory-mapped, so that any one Spec can be
+read without reading or parsing the others.
+
+The file is laid out as:
+
+- the magic bytes `MAGIC`,
+- one record per Spec: the compact JSON array `[layout, value, ...]`, where
+  `layout` is the position of the Spec's parameter names in the layout table,
+- the layout table: a JSON array of each distinct list of parameter names, so
+  that each name is stored once per layout rather than once per Spec,
+- the tree: the JSON shape of the Experiment tree that the Specs are the leaves
+  of, or `null` if the Specs are just a list (see `write_tree()`),
+- the index: the offset of each record, and of the end of the last record, as
+  little-endian unsigned 64-bit integers, and
+- the footer: the offsets of the layout table, the tree, and the index, the
+  number of Specs, and `MAGIC` again.
+
+The footer is at the end, so a store can be written in one pass to a file that
+cannot seek, like a pipe.
+"""
+
+import builtins
+import itertools
+import json
+import mmap
+import struct
+import sys
+from array import array
+from typing import IO, Any, Iterable, Iterator
+
+from griddler.core import (
+    Experiment,
+    ProductExperiment,
+    Spec,
+    UnionExperiment,
+    _as_spec,
+    _check_index,
+    _Layout,
+)
+
+MAGIC = b"GRDLSTR2"
+
+# a record's offset and the next one, i.e., where it starts and stops
+_OFFSETS = struct.Struct("<QQ")
+_FOOTER = struct.Struct(f"<QQQQ{len(MAGIC)}s")
+
+# one encoder for every record, matching the writers' compact JSON
+_ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+
+def write(specs: Iterable[dict], f: IO[bytes], tree: Any = None) -> None:
+    """Write Specs to a binary file as a store.
+
+    Args:
+        specs (Iterable[dict]): Specs, which are consumed lazily
+        f (IO[bytes]): output file, opened in binary mode
+        tree (Any): shape of the Experiment tree whose leaves are the Specs, as
+          made by `write_tree()`, or None if the Specs are just a list
+    """
+    f.write(MAGIC)
+    position = len(MAGIC)
+    offsets = array("Q", [position])
+    layouts: dict[tuple[str, ...], int] = {}
+
+    for spec in specs:
+        spec = _as_spec(spec)
+        layout = layouts.setdefault(spec._layout.keys, len(layouts))
+        record = _ENCODER.encode([layout, *spec._values]).encode()
+        f.write(record)
+        position += len(record)
+        offsets.append(position)
+
+    layouts_offset = position
+    layout_table = _ENCODER.encode([list(keys) for keys in layouts]).encode()
+    f.write(layout_table)
+
+    tree_offset = layouts_offset + len(layout_table)
+    tree_json = _ENCODER.encode(tree).encode()
+    f.write(tree_json)
+
+    index_offset = tree_offset + len(tree_json)
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    f.write(offsets.tobytes())
+
+    f.write(
+        _FOOTER.pack(layouts_offset, tree_offset, index_offset, len(offsets) - 1, MAGIC)
+    )
+    f.flush()
+
+
+def write_tree(experiment: Experiment, f: IO[bytes]) -> None:
+    """
+    Write an Experiment to a binary file as a store of the Specs of its leaves,
+    with the shape of its tree of products and unions, so that
+    `SpecStore.tree()` can make the same tree again. A leaf that appears in the
+    tree more than once is written once. An Experiment that is not a product or
+    a union is written as a list of its Specs, as by `write()`.
+
+    Args:
+        experiment (Experiment): Experiment
+        f (IO[bytes]): output file, opened in binary mode
+    """
+    if not isinstance(experiment, (ProductExperiment, UnionExperiment)):
+        write(experiment, f)
+        return
+
+    leaves: dict[int, tuple[Experiment, int]] = {}
+    tree = _shape(experiment, leaves)
+    write(
+        itertools.chain.from_iterable(leaf for leaf, _ in leaves.values()),
+        f,
+        tree=tree,
+    )
+
+
+def _shape(experiment: Experiment, leaves: dict[int, tuple[Experiment, int]]) -> Any:
+    """
+    The shape of an Experiment tree, as JSON: `{"product": [...]}`,
+    `{"union": [...]}`, or, for a leaf, the `[start, stop]` range of its Specs.
+    Each new leaf is added to `leaves`, by id, with the index of its first Spec.
+    """
+    if isinstance(experiment, ProductExperiment):
+        return {"product": [_shape(x, leaves) for x in experiment.factors]}
+    elif isinstance(experiment, UnionExperiment):
+        return {"union": [_shape(x, leaves) for x in experiment.branches]}
+
+    if id(experiment) not in leaves:
+        start = sum(len(leaf) for leaf, _ in leaves.values())
+        leaves[id(experiment)] = (experiment, start)
+
+    _, start = leaves[id(experiment)]
+    return [start, start + len(experiment)]
+
+
+def open(path: str) -> "SpecStore":
+    """Open a store for reading. See `SpecStore`.
+
+    Args:
+        path (str): path to the store
+
+    Returns:
+        SpecStore: the Specs in the store
+    """
+    return SpecStore(path)
+
+
+class SpecStore(Experiment):
+    """
+    An Experiment whose Specs are read, one at a time, from a memory-mapped store.
+
+    Looking up a Spec reads only its two offsets in the index and its record.
+    Close the store when done with it, or use it as a context manager.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with builtins.open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        size = len(self._mmap)
+        if size < len(MAGIC) + _FOOTER.size or self._mmap[: len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise RuntimeError(f"Not a griddler spec store: {path}")
+
+        footer = _FOOTER.unpack_from(self._mmap, size - _FOOTER.size)
+        layouts_offset, tree_offset, self._index_offset, self._len, magic = footer
+        if magic != MAGIC:
+            self._mmap.close()
+            raise RuntimeError(f"Spec store is truncated: {path}")
+
+        self._layouts = [
+            _Layout.of(tuple(keys))
+            for keys in json.loads(self._mmap[layouts_offset:tree_offset])
+        ]
+        self._tree = json.loads(self._mmap[tree_offset : self._index_offset])
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def tree(self) -> Experiment:
+        """
+        The Experiment tree written by `write_tree()`, with each leaf's Specs read
+        into memory, so that it has the same products and unions as the tree that
+        was written. If the store is just a list of Specs, the store itself.
+        """
+        if self._tree is None:
+            return self
+
+        leaves: dict[tuple[int, int], Experiment] = {}
+        return self._make_tree(self._tree, leaves)
+
+    def _make_tree(
+        self, shape: Any, leaves: dict[tuple[int, int], Experiment]
+    ) -> Experiment:
+        if isinstance(shape, dict) and "product" in shape:
+            return ProductExperiment(
+                self._make_tree(x, leaves) for x in shape["product"]
+            )
+        elif isinstance(shape, dict):
+            return UnionExperiment(self._make_tree(x, leaves) for x in shape["union"])
+
+        # a leaf that was written once is made once, however often it appears
+        start, stop = shape
+        if (start, stop) not in leaves:
+            leaves[start, stop] = Experiment(list(self._iter_range(start, stop)))
+
+        return leaves[start, stop]
+
+    def __reduce__(self):
+        # memory maps cannot be pickled, so open the store again
+        return (SpecStore, (self.path,))
+
+    def __enter__(self) -> "SpecStore":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[Spec]:
+        return self._iter_range(0, len(self))
+
+    def __getitem__(self, index: int) -> Spec:
+        return self._read(_check_index(index, len(self)))
+
+    def _iter_range(self, start: int, stop: int) -> Iterator[Spec]:
+        for i in range(start, min(stop, len(self))):
+            yield self._read(i)
+
+    def _read(self, i: int) -> Spec:
+        """Decode the i-th record"""
+        # each offset is 8 bytes
+        start, stop = _OFFSETS.unpack_from(self._mmap, self._index_offset + 8 * i)
+        layout, *values = json.loads(self._mmap[start:stop])
+        return Spec._make(self._layouts[layout], tuple(values))
@@ -0,0 +1,276 @@
+"""Serialize Specs to a file, streaming them from an iterator."""
+
+import concurrent.futures
+import json
+from typing import IO, Iterable, Iterator, Sequence
+
+import yaml
+
+import griddler.codecs
+import griddler.store
+from griddler.core import Experiment, _as_dict, spec_id
+
+FORMATS = ["json", "yaml", "ndjson", "json-seq", "binary"]
+
+# file name extension of each format
+EXTENSIONS = {
+    "json": ".json",
+    "yaml": ".yaml",
+    "ndjson": ".ndjson",
+    "json-seq": ".json-seq",
+    "binary": ".griddler",
+}
+
+# formats whose output is the concatenation of each Spec's encoding, so that
+# chunks of Specs can be encoded separately
+STREAMING_FORMATS = ["json", "ndjson", "json-seq"]
+
+# number of Specs encoded before each write to the output
+CHUNK_SIZE = 1000
+
+# record separator that starts each JSON text sequence record (RFC 7464)
+RECORD_SEPARATOR = "\x1e"
+
+
+def write(
+    specs: Iterable[dict],
+    f: IO[str],
+    format: str,
+    chunk_size: int = CHUNK_SIZE,
+    codec: str = "auto",
+) -> None:
+    """Write Specs to a file in this format.
+
+    Args:
+        specs (Iterable[dict]): Specs, which are consumed lazily
+        f (IO[str]): output file
+        format (str): one of `FORMATS`
+        chunk_size (int): number of Specs encoded before each write and flush.
+          Ignored for yaml, which is not streamed, and for binary, which is a
+          `griddler.store`.
+        codec (str): name of the codec that encodes yaml and JSON. See
+          `griddler.codecs`.
+    """
+    if format in STREAMING_FORMATS:
+        pieces = _records(specs, format, codec=codec)
+        if format == "json":
+            pieces = _json_array(pieces)
+
+        _write_chunks(pieces, f, chunk_size)
+    elif format == "yaml":
+        yaml.dump(
+            [_as_dict(spec) for spec in specs],
+            f,
+            Dumper=griddler.codecs.get(codec).yaml_dumper,
+        )
+    elif format == "binary":
+        # a store is written to the binary file underneath the text file
+        f.flush()
+        griddler.store.write(specs, f.buffer)
+    else:
+        raise RuntimeError(f"Invalid output format {format}")
+
+
+def write_experiment(
+    experiment: Experiment,
+    f: IO[str],
+    format: str,
+    indices: Sequence[int] | None = None,
+    workers: int = 1,
+    manifest: IO[str] | None = None,
+    chunk_size: int = CHUNK_SIZE,
+    codec: str = "auto",
+) -> None:
+    """Write some or all of the Specs of an Experiment, possibly in parallel.
+
+    With more than one worker, the indices are split into chunks, and each chunk
+    of Specs is expanded and encoded in a pool of processes. The chunks are
+    written in order, so the output is the same as with one worker. yaml and
+    binary output are not chunked, so they are always written by one worker.
+
+    Args:
+        experiment (Experiment): Experiment
+        f (IO[str]): output file
+        format (str): one of `FORMATS`
+        indices (Sequence[int] | None): indices of the Specs to write, e.g., from
+          `Experiment.shard_indices()` or `Experiment.sample_indices()`. If None,
+          write all the Specs.
+        workers (int): number of worker processes
+        manifest (IO[str] | None): if not None, also write the manifest of the
+          Specs to this file. See `write_manifest()`.
+        chunk_size (int): number of Specs encoded before each write
+        codec (str): name of the codec that encodes yaml and JSON
+    """
+    if indices is None:
+        indices = range(len(experiment))
+
+    if workers == 1 or format not in STREAMING_FORMATS:
+        specs = _iter_indices(experiment, indices)
+        if manifest is not None:
+            specs = tee_manifest(specs, indices, manifest)
+
+        write(specs, f, format, chunk_size, codec)
+        return
+
+    chunks = [indices[i : i + chunk_size] for i in range(0, len(indices), chunk_size)]
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=_set_experiment, initargs=(experiment,)
+    ) as executor:
+        encoded = executor.map(
+            _encode_chunk,
+            chunks,
+            [format] * len(chunks),
+            [i == 0 for i in range(len(chunks))],
+            [manifest is not None] * len(chunks),
+            [codec] * len(chunks),
+        )
+
+        for text, manifest_text in encoded:
+            f.write(text)
+            f.flush()
+            if manifest is not None:
+                manifest.write(manifest_text)
+                manifest.flush()
+
+    if format == "json":
+        f.write("[]" if len(indices) == 0 else "\n]")
+        f.flush()
+
+
+# the Experiment being written by a worker process
+_experiment: Experiment | None = None
+
+
+def _set_experiment(experiment: Experiment) -> None:
+    global _experiment
+    _experiment = experiment
+
+
+def _encode_chunk(
+    indices: Sequence[int],
+    format: str,
+    first: bool,
+    with_manifest: bool,
+    codec: str,
+) -> tuple[str, str]:
+    """Encode a chunk of the worker's Experiment, and optionally its manifest"""
+    specs = list(_iter_indices(_experiment, indices))
+    text = "".join(_records(specs, format, first, codec))
+
+    if with_manifest:
+        manifest_text = "".join(
+            _dumps({"index": index, "id": spec_id(spec)}) + "\n"
+            for index, spec in zip(indices, specs)
+        )
+    else:
+        manifest_text = ""
+
+    return text, manifest_text
+
+
+def _iter_indices(experiment: Experiment, indices: Sequence[int]) -> Iterator[dict]:
+    """Generate the Specs of an Experiment at these indices"""
+    if isinstance(indices, range) and indices.step == 1:
+        return experiment._iter_range(indices.start, indices.stop)
+    else:
+        return (experiment[i] for i in indices)
+
+
+def _dumps(spec: dict) -> str:
+    return json.dumps(_as_dict(spec), separators=(",", ":"))
+
+
+def _records(
+    specs: Iterable[dict], format: str, first: bool = True, codec: str = "auto"
+) -> Iterator[str]:
+    """
+    Encode each Spec for a streaming format. JSON array elements are preceded by
+    the start of the array, if `first`, or by a comma, but the end of the array is
+    not included.
+    """
+    codec = griddler.codecs.get(codec)
+
+    if format == "json":
+        for spec in specs:
+            # nest each indented Spec one level into the array
+            yield ("[\n  " if first else ",\n  ") + codec.json_dumps_indented(
+                _as_dict(spec)
+            ).replace("\n", "\n  ")
+            first = False
+    elif format == "ndjson":
+        for spec in specs:
+            yield codec.json_dumps(_as_dict(spec)) + "\n"
+    elif format == "json-seq":
+        for spec in specs:
+            yield RECORD_SEPARATOR + codec.json_dumps(_as_dict(spec)) + "\n"
+    else:
+        raise RuntimeError(f"Invalid streaming format {format}")
+
+
+def _json_array(records: Iterable[str]) -> Iterator[str]:
+    """
+    Finish the pieces of a JSON array, so that they have the same bytes as
+    `json.dump(list(specs), f, indent=2)`.
+    """
+    empty = True
+    for record in records:
+        yield record
+        empty = False
+
+    yield "[]" if empty else "\n]"
+
+
+def _write_chunks(pieces: Iterable[str], f: IO[str], chunk_size: int) -> None:
+    """Write pieces of text in chunks, flushing after each chunk"""
+    chunk = []
+    for piece in pieces:
+        chunk.append(piece)
+        if len(chunk) >= chunk_size:
+            f.write("".join(chunk))
+            f.flush()
+            chunk = []
+
+    f.write("".join(chunk))
+    f.flush()
+
+
+def write_manifest(
+    indexed_specs: Iterable[tuple[int, dict]],
+    f: IO[str],
+    chunk_size: int = CHUNK_SIZE,
+) -> None:
+    """Write a manifest of Specs' indices and IDs, as newline-delimited JSON.
+
+    Each line is like `{"index":0,"id":"..."}`, where the ID is from
+    `griddler.core.spec_id()`.
+
+    Args:
+        indexed_specs (Iterable[tuple[int, dict]]): indices and Specs
+        f (IO[str]): output file
+        chunk_size (int): number of records encoded before each write and flush
+    """
+    records = (
+        _dumps({"index": index, "id": spec_id(spec)}) + "\n"
+        for index, spec in indexed_specs
+    )
+    _write_chunks(records, f, chunk_size)
+
+
+def tee_manifest(
+    specs: Iterable[dict], indices: Iterable[int], f: IO[str]
+) -> Iterator[dict]:
+    """
+    Pass Specs through unchanged, writing their manifest as they are consumed.
+    See `write_manifest()`.
+    """
+    buffer = []
+    for index, spec in zip(indices, specs):
+        buffer.append((index, spec))
+        yield spec
+
+        if len(buffer) >= CHUNK_SIZE:
+            write_manifest(buffer, f)
+            buffer.clear()
+
+    write_manifest(buffer, f)
@@ -1,9 +1,15 @@
+import functools
+import operator
+import random
 from typing import Any
 
 import pytest
 import yaml
 
-from griddler import parse
+import griddler.core
+from griddler import count, parse
+from griddler.core import _MIN_SPECS_PER_NODE, Experiment, _n_nodes
+from griddler.schemas.v03 import _conditional_product, _partition
 
 
 def text_to_dicts(text: str) -> list[dict[str, Any]]:
@@ -40,6 +46,24 @@ def test_vary():
         assert x in actual
 
 
+def test_vary_order_follows_griddle():
+    actual = text_to_dicts("""
+    schema: v0.3
+    parameters:
+      R0: {vary: [1.5, 2.0]}
+      gamma: {vary: [0.3, 0.4]}
+      method: {fix: brent}
+    """)
+
+    assert [list(spec) for spec in actual] == [["R0", "gamma", "method"]] * 4
+    assert [(spec["R0"], spec["gamma"]) for spec in actual] == [
+        (1.5, 0.3),
+        (1.5, 0.4),
+        (2.0, 0.3),
+        (2.0, 0.4),
+    ]
+
+
 def test_bundle():
     assert text_to_dicts("""
     schema: v0.3
@@ -101,3 +125,127 @@ def test_reserved_words():
             R0: [1.0, 1.5]
             comment: []
         """)
+
+
+def test_chained_conditionals():
+    actual = text_to_dicts("""
+    schema: v0.3
+    parameters:
+      method: {vary: [newton, brent, bisect]}
+      gamma: {vary: [0.1, 0.2]}
+      start_point:
+        if: {equals: {method: newton}}
+        vary: [0.25, 0.75]
+      tolerance:
+        if: {equals: {method: newton}}
+        fix: 0.001
+      bounds:
+        if: {equals: {method: brent}}
+        fix: [0.0, 1.0]
+      method_2:
+        if: {equals: {start_point: 0.75}}
+        fix: secant
+    """)
+
+    expected = []
+    for method in ["newton", "brent", "bisect"]:
+        for gamma in [0.1, 0.2]:
+            spec = {"method": method, "gamma": gamma}
+            if method == "newton":
+                for start_point in [0.25, 0.75]:
+                    expected.append(
+                        spec | {"start_point": start_point, "tolerance": 0.001}
+                    )
+                    if start_point == 0.75:
+                        expected[-1]["method_2"] = "secant"
+            elif method == "brent":
+                expected.append(spec | {"bounds": [0.0, 1.0]})
+            else:
+                expected.append(spec)
+
+    assert len(actual) == len(expected)
+    for x in expected:
+        assert x in actual
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("min_specs_per_node", [0, griddler.core._MIN_SPECS_PER_NODE])
+def test_partition_matches_filter(seed, min_specs_per_node, monkeypatch):
+    # with no minimum, even small trees are partitioned structurally
+    monkeypatch.setattr(griddler.core, "_MIN_SPECS_PER_NODE", min_specs_per_node)
+    rng = random.Random(seed)
+
+    def random_experiment(depth):
+        if depth == 0 or rng.random() < 0.3:
+            return Experiment(
+                [
+                    {
+                        k: rng.choice([1, 2])
+                        for k in rng.sample("abc", rng.randint(0, 2))
+                    }
+                    for _ in range(rng.randint(0, 3))
+                ]
+            )
+
+        children = [random_experiment(depth - 1) for _ in range(rng.randint(1, 3))]
+        return functools.reduce(
+            operator.mul if rng.random() < 0.5 else operator.or_, children
+        )
+
+    experiment = random_experiment(3)
+    match, unmatch = _partition(experiment, "a", 1)
+    assert match.specs == [x for x in experiment if x.get("a") == 1]
+    assert unmatch.specs == [x for x in experiment if x.get("a") != 1]
+
+
+def test_unmatched_specs_are_not_rebuilt():
+    left = Experiment([{"method": "brent"}])
+    right = Experiment([{"start_point": 0.25}])
+    condition = {"equals": {"method": "newton"}}
+    assert _conditional_product(left, right, condition) is left
+
+
+def test_conditions_on_many_keys_keep_the_tree_small():
+    parameters = {f"switch{i}": {"vary": [False, True]} for i in range(8)}
+    parameters |= {
+        f"x{i}": {"if": {"equals": {f"switch{i}": True}}, "vary": [0, 1]}
+        for i in range(8)
+    }
+    experiment = parse({"schema": "v0.3", "parameters": parameters}, optimize=False)
+
+    assert len(experiment) == count({"schema": "v0.3", "parameters": parameters})
+    assert len(experiment) == 3**8
+    assert _n_nodes(experiment) * _MIN_SPECS_PER_NODE <= len(experiment)
+
+
+def test_count():
+    griddle = yaml.safe_load("""
+    schema: v0.3
+    parameters:
+      method: {vary: [newton, brent, bisect]}
+      gamma: {vary: [0.1, 0.2]}
+      scenario:
+        R0: [1.0, 1.5, 2.0]
+        infectious_period: [2.0, 3.0, 4.0]
+      start_point:
+        if: {equals: {method: newton}}
+        vary: [0.25, 0.75]
+      bounds:
+        if: {equals: {method: brent}}
+        vary: [[0.0, 1.0], [0.0, 2.0]]
+      tolerance:
+        if: {equals: {bounds: [0.0, 1.0]}}
+        vary: [0.1, 0.01, 0.001]
+    """)
+
+    assert count(griddle) == len(parse(griddle).specs) == 12 + 18 + 6 + 6
+
+
+def test_count_is_lazy():
+    griddle = {
+        "schema": "v0.3",
+        "parameters": {f"p{i}": {"vary": list(range(1000))} for i in range(4)}
+        | {"method": {"if": {"equals": {"p0": 0}}, "vary": ["newton", "brent"]}},
+    }
+
+    assert count(griddle) == 1001 * 1000**3
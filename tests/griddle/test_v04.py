@@ -4,7 +4,7 @@ import jsonschema
 import jsonschema.exceptions
 import pytest
 
-from griddler import parse
+from griddler import count, parse
 from griddler.schemas.v04 import load_schema
 
 
@@ -146,3 +146,57 @@ class TestSchema:
                 ]
             }
         )
+
+
+class TestParseEmpty:
+    def test_empty_union(self):
+        griddle = {"schema": "v0.4", "experiment": {"union": []}}
+        assert parse(griddle).specs == []
+
+    def test_empty_product(self):
+        griddle = {"schema": "v0.4", "experiment": {"product": []}}
+        assert parse(griddle).specs == [{}]
+
+    def test_wide_union(self):
+        branches = [[{"seed": i}] for i in range(2000)]
+        griddle = {"schema": "v0.4", "experiment": {"union": branches}}
+        experiment = parse(griddle, optimize=False)
+        assert len(experiment.branches) == 2000
+        assert experiment.specs == [{"seed": i} for i in range(2000)]
+
+
+class TestCount:
+    def test_count(self):
+        griddle = {
+            "schema": "v0.4",
+            "experiment": {
+                "product": [
+                    [{"R0": 1.5}, {"R0": 2.0}],
+                    {
+                        "union": [
+                            [{"method": "brent"}],
+                            [{"lower": 0.0}, {"lower": 1.0}],
+                        ]
+                    },
+                    {"union": []},
+                ]
+            },
+        }
+        assert count(griddle) == len(parse(griddle).specs) == 0
+
+        griddle["experiment"]["product"].pop()
+        assert count(griddle) == len(parse(griddle).specs) == 6
+
+    def test_max_specs(self):
+        griddle = {
+            "schema": "v0.4",
+            "experiment": {
+                "product": [[{f"p{i}": j} for j in range(100)] for i in range(5)]
+            },
+        }
+        assert count(griddle) == 100**5
+
+        with pytest.raises(RuntimeError, match="more than the maximum"):
+            parse(griddle, max_specs=1000)
+
+        assert len(parse(griddle, max_specs=100**5)) == 100**5
@@ -0,0 +1,29 @@
+import pytest
+
+import benchmarks.codecs
+import griddler
+from benchmarks.griddles import GRIDDLES
+from benchmarks.run import compare, run
+
+
+@pytest.mark.parametrize("name", GRIDDLES)
+def test_griddles_scale(name):
+    lens = [len(griddler.parse(GRIDDLES[name](e))) for e in [2, 3]]
+    assert lens[1] == 10 * lens[0]
+
+
+def test_run_and_compare(capsys):
+    records = run(["v04_tree"], [2])
+    assert [x["stage"] for x in records] == ["parse", "expand", "serialize"]
+    assert all(x["n_specs"] == 100 and "peak_bytes" in x for x in records)
+
+    assert compare(records, records) == []
+
+    faster = [x | {"seconds": x["seconds"] / 10} for x in records]
+    assert len(compare(records, faster)) == 3
+
+
+def test_codecs():
+    records = benchmarks.codecs.run(["stdlib", "auto"], [2])
+    assert len(records) == 2 * 5
+    assert all(x["seconds"] >= 0 for x in records)
@@ -0,0 +1,155 @@
+import datetime
+import os
+
+import pytest
+
+import griddler
+import griddler.cache
+from griddler.optimizer import explain
+from griddler.store import SpecStore
+
+GRIDDLE = {
+    "schema": "v0.4",
+    "experiment": {
+        "product": [
+            [{"R0": 1.5}, {"R0": 2.0}],
+            [{"gamma": 0.3}, {"gamma": 0.4, "bounds": [0.0, 1.0]}],
+        ]
+    },
+}
+
+
+@pytest.fixture
+def no_parsing(monkeypatch):
+    """Fail if a griddle is parsed, rather than read from the cache"""
+
+    def _parse(*args):
+        raise AssertionError("Griddle was parsed")
+
+    return lambda: monkeypatch.setattr(griddler, "_parse", _parse)
+
+
+def items(experiment) -> list[list[tuple]]:
+    """Specs with their parameters in order"""
+    return [list(spec.items()) for spec in experiment]
+
+
+def test_cache_hit(tmp_path, no_parsing):
+    parsed = griddler.parse(GRIDDLE, cache=tmp_path)
+    assert len(list(tmp_path.glob("*.griddler"))) == 1
+
+    no_parsing()
+    cached = griddler.parse(GRIDDLE, cache=tmp_path)
+    assert items(cached) == items(parsed)
+    # the same tree of products and unions
+    assert explain(cached) == explain(parsed)
+
+
+def test_hit_samples_and_filters_as_miss(tmp_path, no_parsing):
+    griddle = {
+        "schema": "v0.3",
+        "parameters": {
+            "method": {"vary": ["newton", "brent"]},
+            "R0": {"vary": [1.5, 2.0, 2.5, 3.0]},
+            "seed": {"vary": list(range(5))},
+            "tolerance": {"if": {"equals": {"method": "newton"}}, "fix": 0.001},
+        },
+    }
+    miss = griddler.parse(griddle, cache=tmp_path)
+    no_parsing()
+    hit = griddler.parse(griddle, cache=tmp_path)
+
+    for method in ["uniform", "latin-hypercube"]:
+        assert hit.sample_indices(4, seed=3, method=method) == miss.sample_indices(
+            4, seed=3, method=method
+        )
+
+    assert explain(hit.where("seed", "<", 2)) == explain(miss.where("seed", "<", 2))
+    assert items(hit.where("seed", "<", 2)) == items(miss.where("seed", "<", 2))
+
+
+def test_key_keeps_order():
+    reordered = {"experiment": GRIDDLE["experiment"], "schema": "v0.4"}
+    assert griddler.cache.key(reordered) != griddler.cache.key(GRIDDLE)
+    assert griddler.cache.key(GRIDDLE | {"schema": "v0.3"}) != griddler.cache.key(
+        GRIDDLE
+    )
+
+
+def test_reordered_grid_parameters(tmp_path):
+    griddles = [
+        {
+            "schema": "v0.1",
+            "grid_parameters": {"R0": [1.5, 2.0], "gamma": [0.3, 0.4]},
+        },
+        {
+            "schema": "v0.1",
+            "grid_parameters": {"gamma": [0.3, 0.4], "R0": [1.5, 2.0]},
+        },
+    ]
+    assert griddler.cache.key(griddles[0]) != griddler.cache.key(griddles[1])
+
+    for griddle in griddles:
+        griddler.parse(griddle, cache=tmp_path)
+
+    for griddle in griddles:
+        parsed = griddler.parse(griddle)
+        assert items(griddler.parse(griddle, cache=tmp_path)) == items(parsed)
+
+
+@pytest.mark.parametrize(
+    "parameters,is_cached",
+    [
+        ({"weights": {"a": 0.5}, "bounds": [0.0, float("inf")]}, True),
+        ({"weights": {1: 0.5}}, False),
+        ({"start": datetime.date(2020, 1, 1)}, False),
+        ({"bounds": (0.0, 1.0)}, False),
+    ],
+)
+def test_hit_is_the_same_as_miss(tmp_path, parameters, is_cached):
+    griddle = {"schema": "v0.4", "experiment": [parameters, {"seed": 1}]}
+    assert griddler.cache.cacheable(griddle) == is_cached
+
+    miss = griddler.parse(griddle, cache=tmp_path)
+    assert len(list(tmp_path.glob("*.griddler"))) == int(is_cached)
+
+    hit = griddler.parse(griddle, cache=tmp_path)
+    assert isinstance(hit, SpecStore) == is_cached
+    assert items(hit) == items(miss)
+    if is_cached:
+        hit.close()
+
+
+def test_key_of_uncacheable_griddle():
+    with pytest.raises(ValueError, match="cannot be cached"):
+        griddler.cache.key({"schema": "v0.4", "experiment": [{"weights": {1: 0.5}}]})
+
+
+def test_cache_max_specs(tmp_path):
+    griddler.parse(GRIDDLE, cache=tmp_path)
+
+    with pytest.raises(RuntimeError, match="more than the maximum"):
+        griddler.parse(GRIDDLE, cache=tmp_path, max_specs=3)
+
+
+def test_evict_least_recently_used(tmp_path):
+    griddles = [{"schema": "v0.4", "experiment": [{"seed": i}]} for i in range(3)]
+    for i, griddle in enumerate(griddles):
+        griddler.cache.save(tmp_path, griddle, griddler.parse(griddle))
+        path = tmp_path / (griddler.cache.key(griddle) + griddler.cache.SUFFIX)
+        os.utime(path, (i, i))
+
+    # reading the oldest entry makes it the most recently used
+    griddler.cache.load(tmp_path, griddles[0]).close()
+
+    entry_size = path.stat().st_size
+    griddler.cache.evict(tmp_path, max_bytes=2 * entry_size)
+
+    assert griddler.cache.load(tmp_path, griddles[1]) is None
+    for griddle in [griddles[0], griddles[2]]:
+        griddler.cache.load(tmp_path, griddle).close()
+
+
+def test_no_temporary_files_left(tmp_path):
+    griddler.parse(GRIDDLE, cache=tmp_path)
+    assert [path.suffix for path in tmp_path.iterdir()] == [".griddler"]
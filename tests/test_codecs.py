@@ -0,0 +1,94 @@
+import io
+import json
+import math
+
+import pytest
+import yaml
+
+import griddler.codecs
+from griddler.writers import write
+
+SPECS = [
+    {"method": "brent", "bounds": [0.0, 1.0], "label": "é/a"},
+    {"method": "newton", "start_point": {"x": 0.25}, "big": 1e16},
+    {},
+]
+
+
+def written(specs, format, codec) -> str:
+    f = io.StringIO()
+    write(iter(specs), f, format, codec=codec)
+    return f.getvalue()
+
+
+@pytest.mark.parametrize("format", ["json", "ndjson", "json-seq", "yaml"])
+def test_auto_output_is_stdlib_output(format):
+    assert written(SPECS, format, "auto") == written(SPECS, format, "stdlib")
+
+
+@pytest.mark.parametrize("codec", griddler.codecs.CODECS)
+def test_codecs_round_trip(codec):
+    c = griddler.codecs.get(codec)
+    assert yaml.load(written(SPECS, "yaml", codec), Loader=c.yaml_loader) == SPECS
+    assert c.json_loads(written(SPECS, "json", codec)) == SPECS
+
+
+def test_stdlib_codec():
+    codec = griddler.codecs.get("stdlib")
+    assert codec.yaml_loader is yaml.SafeLoader
+    assert codec.yaml_dumper is yaml.Dumper
+
+
+def test_unknown_codec():
+    with pytest.raises(RuntimeError, match="Unknown codec"):
+        griddler.codecs.get("simd")
+
+
+@pytest.fixture
+def strict_backend(monkeypatch):
+    """
+    An accelerated JSON backend that, like orjson, reads neither NaN nor Infinity,
+    and writes them as null
+    """
+    calls = []
+
+    def loads(text):
+        calls.append(text)
+        return json.loads(text, parse_constant=_reject)
+
+    def dumps(x):
+        # like orjson, writes non-finite floats as null
+        return json.dumps(x).replace("NaN", "null").replace("Infinity", "null")
+
+    backend = (loads, dumps, dumps)
+    monkeypatch.setattr(griddler.codecs, "_json_backend", lambda: backend)
+    griddler.codecs.get.cache_clear()
+    yield calls
+    griddler.codecs.get.cache_clear()
+
+
+def _reject(constant):
+    raise ValueError(f"Not JSON: {constant}")
+
+
+def test_auto_reads_json_with_stdlib(strict_backend):
+    codec = griddler.codecs.get("auto")
+    assert codec.json_loads is json.loads
+    assert math.isnan(codec.json_loads('{"R0": NaN}')["R0"])
+    assert strict_backend == []
+
+
+def test_fast_falls_back_to_stdlib(strict_backend):
+    codec = griddler.codecs.get("fast")
+    assert codec.json_loads('{"R0": 1.5}') == {"R0": 1.5}
+    assert codec.json_loads('{"R0": Infinity}') == {"R0": math.inf}
+    assert strict_backend == ['{"R0": 1.5}', '{"R0": Infinity}']
+
+
+def test_fast_writes_non_finite_floats_with_stdlib(strict_backend):
+    codec = griddler.codecs.get("fast")
+    assert codec.json_dumps({"R0": 1.5, "x": None}) == '{"R0": 1.5, "x": null}'
+
+    for dumps in [codec.json_dumps, codec.json_dumps_indented]:
+        decoded = codec.json_loads(dumps({"R0": math.nan, "bounds": [0, math.inf]}))
+        assert math.isnan(decoded["R0"]) and decoded["bounds"] == [0, math.inf]
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from griddler import parse
+from griddler.core import Experiment
+
+np = pytest.importorskip("numpy")
+
+from griddler.columnar import ColumnarExperiment  # noqa: E402
+
+
+@pytest.fixture
+def experiment():
+    x = Experiment([{"R0": 1.5}, {"R0": 2.5}])
+    y = Experiment([{"gamma": 1}, {"gamma": 2}, {"gamma": 3}])
+    z = Experiment([{"method": "brent", "bounds": [0.0, 1.0]}, {"R0": 10}])
+    return (x * (y | z)) | (y * Experiment([{"gamma": True, "label": "a"}]))
+
+
+def test_from_experiment_round_trips(experiment):
+    columnar = ColumnarExperiment.from_experiment(experiment)
+    assert len(columnar) == len(experiment)
+    assert columnar.specs == experiment.specs
+    assert columnar.to_experiment().specs == experiment.specs
+
+
+def test_values_keep_their_types(experiment):
+    columnar = ColumnarExperiment.from_experiment(experiment)
+    assert json.dumps(columnar.specs) == json.dumps(experiment.specs)
+    assert type(columnar[0]["gamma"]) is int
+
+
+def test_parameter_order_round_trips():
+    x = Experiment([{"R0": 1}]) | Experiment([{"gamma": 2, "R0": 3}])
+    y = Experiment([{"seed": 0, "R0": 4}, {"method": "brent"}])
+    experiment = (x * y) | Experiment([{"method": "newton", "gamma": 5}])
+
+    columnar = ColumnarExperiment.from_experiment(experiment)
+    assert [list(spec.items()) for spec in columnar] == [
+        list(spec.items()) for spec in experiment
+    ]
+    assert json.dumps(columnar.specs) == json.dumps(experiment.specs)
+
+
+def test_columns_are_native():
+    product = ColumnarExperiment.from_specs([{"R0": 1.5}, {"R0": 2.5}])
+    product *= ColumnarExperiment.from_specs([{"gamma": 1}, {"gamma": 2}])
+    assert isinstance(product, ColumnarExperiment)
+    assert product.columns["R0"].dtype == np.float64
+    assert product.columns["gamma"].tolist() == [1, 2, 1, 2]
+    assert product.masks["gamma"].all()
+
+
+def test_union_masks():
+    union = ColumnarExperiment.from_specs(
+        [{"R0": 1.5}]
+    ) | ColumnarExperiment.from_specs([{"gamma": 1.0}])
+    assert isinstance(union, ColumnarExperiment)
+    assert union.masks["R0"].tolist() == [True, False]
+    assert union.specs == [{"R0": 1.5}, {"gamma": 1.0}]
+
+
+def test_getitem_and_shard(experiment):
+    columnar = ColumnarExperiment.from_experiment(experiment)
+    assert [columnar[i] for i in range(len(columnar))] == experiment.specs
+    assert list(columnar.shard(1, 3)) == list(experiment.shard(1, 3))
+
+
+def test_parse_columnar():
+    griddle = {
+        "schema": "v0.4",
+        "experiment": {
+            "product": [[{"R0": 1.5}, {"R0": 2.5}], [{"gamma": 1.0}, {"gamma": 2.0}]]
+        },
+    }
+    columnar = parse(griddle, columnar=True)
+    assert isinstance(columnar, ColumnarExperiment)
+    assert columnar.specs == parse(griddle).specs
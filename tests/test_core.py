@@ -0,0 +1,406 @@
+import asyncio
+import pickle
+
+import pytest
+
+from griddler.core import (
+    _COMPARISONS,
+    Experiment,
+    ProductExperiment,
+    Spec,
+    UnionExperiment,
+    _Layout,
+    spec_id,
+)
+
+
+def test_product():
+    x = Experiment([{"R0": 1.5}, {"R0": 2.5}])
+    y = Experiment([{"gamma": 1.0}, {"gamma": 2.0}])
+    assert (x * y).specs == [
+        {"R0": 1.5, "gamma": 1.0},
+        {"R0": 1.5, "gamma": 2.0},
+        {"R0": 2.5, "gamma": 1.0},
+        {"R0": 2.5, "gamma": 2.0},
+    ]
+
+
+def test_product_update_order():
+    x = Experiment([{"R0": 1.5, "gamma": 1.0}])
+    y = Experiment([{"gamma": 2.0}])
+    assert (x * y).specs == [{"R0": 1.5, "gamma": 2.0}]
+    assert (y * x).specs == [{"R0": 1.5, "gamma": 1.0}]
+
+
+def test_union():
+    x = Experiment([{"R0": 1.5}])
+    y = Experiment([{"gamma": 1.0}, {"gamma": 2.0}])
+    assert (x | y).specs == [{"R0": 1.5}, {"gamma": 1.0}, {"gamma": 2.0}]
+
+
+def test_identities():
+    x = Experiment([{"R0": 1.5}, {"R0": 2.5}])
+    assert (x * Experiment([{}])).specs == x.specs
+    assert (x * Experiment([])).specs == []
+    assert (x | Experiment([])).specs == x.specs
+
+
+def test_nested_operations_are_flattened():
+    x, y, z = [Experiment([{name: 1}]) for name in "xyz"]
+
+    product = (x * y) * z
+    assert isinstance(product, ProductExperiment)
+    assert product.factors == [x, y, z]
+
+    union = x | (y | z)
+    assert isinstance(union, UnionExperiment)
+    assert union.branches == [x, y, z]
+
+
+def test_len_is_lazy():
+    # a product with 10^12 Specs is never expanded
+    factors = [Experiment([{f"p{i}": j} for j in range(10)]) for i in range(12)]
+    product = factors[0]
+    for factor in factors[1:]:
+        product *= factor
+
+    assert len(product) == 10**12
+    assert len(product | product) == 2 * 10**12
+    assert next(iter(product)) == {f"p{i}": 0 for i in range(12)}
+
+
+def test_getitem():
+    x = Experiment([{"R0": 1.5}, {"R0": 2.5}])
+    y = Experiment([{"gamma": 1.0}, {"gamma": 2.0}, {"gamma": 3.0}])
+    z = Experiment([{"method": "brent"}])
+    expt = (x * (y | z)) | z
+
+    assert [expt[i] for i in range(len(expt))] == expt.specs
+    assert expt[-1] == expt.specs[-1]
+
+
+def test_getitem_out_of_range():
+    expt = Experiment([{"R0": 1.5}]) * Experiment([{"gamma": 1.0}])
+
+    with pytest.raises(IndexError):
+        expt[1]
+
+    with pytest.raises(IndexError):
+        expt[-2]
+
+
+def test_getitem_index_types():
+    np = pytest.importorskip("numpy")
+    expt = Experiment([{"R0": 1.5}, {"R0": 2.5}]) * Experiment([{"gamma": 1.0}])
+
+    assert expt[np.int64(1)] == expt[1]
+    for index in [True, 1.0, "1"]:
+        with pytest.raises(TypeError, match="must be integers"):
+            expt[index]
+
+
+def test_getitem_is_lazy():
+    factors = [Experiment([{f"p{i}": j} for j in range(10)]) for i in range(12)]
+    product = ProductExperiment(factors)
+
+    assert product[123_456_789_012] == {
+        f"p{i}": int(digit) for i, digit in enumerate("123456789012")
+    }
+
+
+@pytest.fixture
+def nested_experiment():
+    x = Experiment([{"R0": 1.5}, {"R0": 2.5}, {"R0": 3.5}])
+    y = Experiment([{"gamma": 1.0}, {"gamma": 2.0}, {"gamma": 3.0}])
+    z = Experiment([{"method": "brent"}, {"method": "newton"}])
+    return (x * (y | z) * z) | Experiment([]) | (y * x)
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 7, 100])
+def test_contiguous_shards_concatenate(nested_experiment, n):
+    shards = [list(nested_experiment.shard(k, n)) for k in range(n)]
+    assert [spec for shard in shards for spec in shard] == nested_experiment.specs
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 7, 100])
+def test_strided_shards_interleave(nested_experiment, n):
+    shards = [list(nested_experiment.shard(k, n, strategy="strided")) for k in range(n)]
+    interleaved = [
+        shards[i % n][i // n] for i in range(sum(len(shard) for shard in shards))
+    ]
+    assert interleaved == nested_experiment.specs
+
+
+def test_bad_shard():
+    with pytest.raises(ValueError, match="not in"):
+        Experiment([{}]).shard(2, 2)
+
+
+def test_spec_id_is_canonical():
+    assert spec_id({"R0": 1.5, "gamma": 1e-3}) == spec_id({"gamma": 0.001, "R0": 1.5})
+    assert spec_id({"a": {"x": 1, "y": 2}}) == spec_id({"a": {"y": 2, "x": 1}})
+    assert spec_id({"R0": 1}) != spec_id({"R0": 1.0})
+    assert spec_id({"R0": 1.5}) != spec_id({"R0": 2.5})
+
+
+def test_spec_id_is_stable():
+    # these values must never change, or cached results would be orphaned
+    assert spec_id({}) == "2afb9b83f9314e5d029766197f539792"
+    assert spec_id({"R0": 1.5, "method": "brent"}) == "d9e80cda893750bf536a477a9bf57c37"
+
+
+def test_spec_ids(nested_experiment):
+    assert list(nested_experiment.spec_ids()) == [
+        spec_id(spec) for spec in nested_experiment
+    ]
+
+
+def test_spec_is_a_read_only_mapping():
+    spec = Spec({"R0": 1.5, "gamma": 1.0})
+    assert spec == {"R0": 1.5, "gamma": 1.0}
+    assert spec == Spec({"gamma": 1.0, "R0": 1.5})
+    assert list(spec) == ["R0", "gamma"]
+    assert "R0" in spec and "method" not in spec
+    assert spec.get("method") is None
+    assert spec.to_dict() == {"R0": 1.5, "gamma": 1.0}
+
+    with pytest.raises(TypeError):
+        spec["R0"] = 2.5
+
+
+def test_spec_update():
+    spec = Spec({"R0": 1.5, "gamma": 1.0})
+    for other in [
+        {"gamma": 2.0, "method": "brent"},
+        Spec({"gamma": 2.0, "method": "brent"}),
+    ]:
+        updated = spec | other
+        assert isinstance(updated, Spec)
+        assert updated.to_dict() == {"R0": 1.5, "gamma": 2.0, "method": "brent"}
+        assert list(updated) == ["R0", "gamma", "method"]
+
+    assert ({"gamma": 2.0, "method": "brent"} | spec).to_dict() == {
+        "gamma": 1.0,
+        "method": "brent",
+        "R0": 1.5,
+    }
+
+
+def test_specs_share_layouts():
+    x = Experiment([{"R0": 1.5}, {"R0": 2.5}])
+    y = Experiment([{"gamma": 1.0}, {"gamma": 2.0}])
+    specs = list(x * y)
+    assert all(isinstance(spec, Spec) for spec in specs)
+    assert len({id(spec._layout) for spec in specs}) == 1
+
+
+def test_iteration_matches_ranges_and_indexing():
+    x = Experiment([{"R0": 1.5}, {"R0": 2.5, "gamma": 0.5}, {"method": "brent"}])
+    y = Experiment([{"gamma": 1.0}, {"R0": 3.5}])
+    z = Experiment([{"method": "newton"}, {"seed": 1, "R0": 4.5}])
+    experiment = x * y * z
+    specs = [list(spec.items()) for spec in experiment]
+
+    assert [list(spec.items()) for spec in experiment.specs] == specs
+    assert [list(experiment[i].items()) for i in range(len(experiment))] == specs
+    for start in range(len(specs) + 1):
+        for stop in range(start, len(specs) + 1):
+            assert [
+                list(spec.items()) for spec in experiment._iter_range(start, stop)
+            ] == specs[start:stop]
+
+
+def test_shared_subtrees_are_expanded_once():
+    class CountingExperiment(Experiment):
+        n_iter = 0
+
+        def __iter__(self):
+            CountingExperiment.n_iter += 1
+            return super().__iter__()
+
+    x = Experiment([{"R0": 1.5}, {"R0": 2.5}])
+    y = Experiment([{"gamma": 1.0}, {"gamma": 2.0}])
+    z = CountingExperiment([{"method": "brent"}, {"method": "newton"}])
+    experiment = x * ((x * z) | (y * z))
+
+    assert len(list(experiment)) == 16
+    assert CountingExperiment.n_iter == 1
+
+
+def test_layout_caches_are_bounded():
+    spec = Spec({"a": 1})
+    for i in range(2 * _Layout._MAX_MERGES):
+        spec | {f"x{i}": i}
+
+    assert len(spec._layout._merges) <= _Layout._MAX_MERGES
+
+
+def test_spec_pickle():
+    spec = Spec({"R0": 1.5, "bounds": [0.0, 1.0]})
+    unpickled = pickle.loads(pickle.dumps(spec))
+    assert unpickled == spec
+    assert unpickled._layout is spec._layout
+
+
+def test_specs_property_is_dicts(nested_experiment):
+    assert all(type(spec) is dict for spec in nested_experiment.specs)
+
+
+def test_nary_operations():
+    x, y, z = [Experiment([{name: 1}, {name: 2}]) for name in "xyz"]
+
+    product = Experiment.product(x, y, z)
+    assert product.factors == [x, y, z]
+    assert product.specs == ((x * y) * z).specs
+    assert x.product(y, z).specs == product.specs
+
+    union = Experiment.union(x, y, z)
+    assert union.branches == [x, y, z]
+    assert union.specs == x.specs + y.specs + z.specs
+
+
+def test_identities_are_dropped():
+    x = Experiment([{"R0": 1.5}, {"R0": 2.5}])
+    assert Experiment.product(Experiment([{}]), x, Experiment([{}])).factors == [x]
+    assert Experiment.union(Experiment([]), x, Experiment([])).branches == [x]
+
+
+@pytest.mark.parametrize("size", [1, 4, 5, 1000])
+def test_iter_batches(nested_experiment, size):
+    batches = list(nested_experiment.iter_batches(size))
+    assert all(len(batch) == size for batch in batches[:-1])
+    assert 0 < len(batches[-1]) <= size
+    assert [spec for batch in batches for spec in batch] == list(nested_experiment)
+
+
+def test_iter_batches_bad_size():
+    with pytest.raises(ValueError, match="positive"):
+        Experiment([{}]).iter_batches(0)
+
+
+@pytest.mark.parametrize("thread", [False, True])
+def test_aiter_batches(nested_experiment, thread):
+    async def collect():
+        return [
+            batch async for batch in nested_experiment.aiter_batches(4, thread=thread)
+        ]
+
+    assert asyncio.run(collect()) == list(nested_experiment.iter_batches(4))
+
+
+def test_aiter_batches_does_not_block_other_tasks():
+    experiment = Experiment([{"seed": i} for i in range(10)])
+    events = []
+
+    async def consume():
+        async for batch in experiment.aiter_batches(1, thread=True):
+            events.append("batch")
+
+    async def other():
+        for _ in range(3):
+            events.append("other")
+            await asyncio.sleep(0)
+
+    async def main():
+        await asyncio.gather(consume(), other())
+
+    asyncio.run(main())
+    assert events.count("batch") == 10
+    # the other task ran between batches
+    assert events.index("other") < len(events) - 1 - events[::-1].index("batch")
+
+
+@pytest.mark.parametrize(
+    "name, op, value",
+    [
+        ("R0", ">", 2.0),
+        ("R0", "==", 1.5),
+        ("gamma", "<=", 2.0),
+        ("method", "!=", "brent"),
+        ("method", ">", 1.0),
+        ("missing", "==", 1.0),
+    ],
+)
+def test_where(nested_experiment, name, op, value):
+    compare = _COMPARISONS[op]
+
+    def matches(spec):
+        try:
+            return name in spec and compare(spec[name], value)
+        except TypeError:
+            return False
+
+    expected = [spec for spec in nested_experiment.specs if matches(spec)]
+    assert nested_experiment.where(name, op, value).specs == expected
+
+
+def test_where_prunes_factors():
+    x = Experiment([{"R0": r} for r in range(10)])
+    y = Experiment([{"seed": s} for s in range(1000)])
+    result = (x * y).where("R0", ">", 6)
+
+    # only the factor with R0 is filtered; the product is never expanded
+    assert isinstance(result, ProductExperiment)
+    assert len(result) == 3000
+    assert result.factors[1] is y
+    assert result[0] == {"R0": 7, "seed": 0}
+
+
+def test_where_chains(nested_experiment):
+    result = nested_experiment.where("R0", ">", 2.0).where("gamma", "==", 1.0)
+    assert result.specs == [
+        spec
+        for spec in nested_experiment.specs
+        if spec.get("R0", 0) > 2.0 and spec.get("gamma") == 1.0
+    ]
+
+
+def test_where_bad_comparison():
+    with pytest.raises(ValueError, match="Unknown comparison"):
+        Experiment([{}]).where("R0", "=", 1)
+
+
+def test_sample_huge_experiment():
+    x = Experiment([{"a": i} for i in range(10_000)])
+    y = Experiment([{"b": i} for i in range(10_000)])
+    z = Experiment([{"c": i} for i in range(10)])
+    experiment = x * y | z
+
+    indices = experiment.sample_indices(100, seed=0)
+    assert indices == sorted(set(indices))
+    assert len(indices) == 100
+    assert indices == experiment.sample_indices(100, seed=0)
+    assert experiment.sample(100, seed=0).specs == [
+        experiment[i].to_dict() for i in indices
+    ]
+
+
+def test_sample_everything(nested_experiment):
+    sample = nested_experiment.sample(len(nested_experiment), seed=1)
+    assert sample.specs == nested_experiment.specs
+
+
+def test_latin_hypercube_covers_each_factor():
+    x = Experiment([{"a": i} for i in range(100)])
+    y = Experiment([{"b": i} for i in range(50)])
+    specs = (x * y).sample(10, seed=2, method="latin-hypercube").specs
+
+    # one value from each tenth of each factor
+    assert sorted(spec["a"] // 10 for spec in specs) == list(range(10))
+    assert sorted(spec["b"] // 5 for spec in specs) == list(range(10))
+
+
+def test_latin_hypercube_has_no_repeats():
+    # every factor has at least k Specs, so no Spec is drawn twice
+    x = Experiment([{"a": i} for i in range(3)])
+    y = Experiment([{"b": i} for i in range(5)])
+    for experiment, k in [(x, 2), (x, 3), (x * y, 2), (x * y, 3)]:
+        for seed in range(200):
+            indices = experiment.sample_indices(k, seed=seed, method="latin-hypercube")
+            assert len(set(indices)) == k
+
+
+@pytest.mark.parametrize("k, method", [(-1, "uniform"), (10, "uniform"), (1, "x")])
+def test_sample_errors(k, method):
+    with pytest.raises(ValueError):
+        Experiment([{"a": i} for i in range(5)]).sample(k, method=method)
@@ -0,0 +1,89 @@
+import pytest
+
+import griddler
+from griddler.core import Experiment, ProductExperiment, spec_id
+from griddler.diffing import diff_experiments
+
+
+def subtract(x: list[dict], y: list[dict]) -> list[dict]:
+    """Multiset difference of Specs, by ID"""
+    y_ids = [spec_id(spec) for spec in y]
+    result = []
+    for spec in x:
+        if spec_id(spec) in y_ids:
+            y_ids.remove(spec_id(spec))
+        else:
+            result.append(spec)
+
+    return result
+
+
+def grid(**values) -> dict:
+    return {
+        "schema": "v0.4",
+        "experiment": {
+            "product": [[{key: x} for x in xs] for key, xs in values.items()]
+        },
+    }
+
+
+def test_diff_one_factor():
+    old = grid(R0=[1.5, 2.0], gamma=[0.1, 0.2], seed=[0, 1])
+    new = grid(R0=[1.5, 2.0], gamma=[0.2, 0.3], seed=[0, 1])
+    added, removed = griddler.diff(old, new)
+
+    # only the changed factor was compared, so the results are still products
+    assert isinstance(added, ProductExperiment)
+    assert added.specs == [
+        {"R0": R0, "gamma": 0.3, "seed": seed} for R0 in [1.5, 2.0] for seed in [0, 1]
+    ]
+    assert removed.specs == [
+        {"R0": R0, "gamma": 0.1, "seed": seed} for R0 in [1.5, 2.0] for seed in [0, 1]
+    ]
+
+
+def test_diff_is_structural():
+    old = grid(**{f"p{i}": list(range(10)) for i in range(8)})
+    new = grid(**{f"p{i}": list(range(10 + (i == 3))) for i in range(8)})
+    added, removed = griddler.diff(old, new)
+    assert len(added) == 10**7
+    assert len(removed) == 0
+    assert added[0] == {f"p{i}": 10 if i == 3 else 0 for i in range(8)}
+
+
+def test_diff_same():
+    griddle = grid(R0=[1.5, 2.0])
+    added, removed = griddler.diff(griddle, griddle)
+    assert added.specs == removed.specs == []
+
+
+@pytest.mark.parametrize(
+    "old, new",
+    [
+        # a later factor overwrites the changed parameter
+        (
+            Experiment([{"R0": 1.0}, {"R0": 2.0}]) * Experiment([{"R0": 3.0}]),
+            Experiment([{"R0": 1.0}]) * Experiment([{"R0": 3.0}]),
+        ),
+        # Specs move between union branches
+        (
+            Experiment([{"R0": 1.0}]) | Experiment([{"R0": 2.0}]),
+            Experiment([{"R0": 2.0}]) | Experiment([{"R0": 1.0}]),
+        ),
+        # the trees have different shapes
+        (
+            Experiment([{"R0": 1.0}, {"R0": 2.0}]),
+            Experiment([{"R0": 2.0}]) * Experiment([{"gamma": 1.0}, {}]),
+        ),
+        # duplicate Specs
+        (
+            Experiment([{"R0": 1.0}, {"R0": 1.0}]),
+            Experiment([{"R0": 1.0}, {"R0": 1}]),
+        ),
+    ],
+)
+def test_diff_matches_multiset_difference(old, new):
+    added, removed = diff_experiments(old, new)
+
+    assert added.specs == subtract(new.specs, old.specs)
+    assert removed.specs == subtract(old.specs, new.specs)
@@ -1,7 +1,7 @@
 import pytest
 import yaml
 
-from griddler import parse
+from griddler import count, parse
 from griddler.schemas.v01 import _get_match, _is_match
 
 
@@ -126,3 +126,61 @@ def test_unmatched_nests():
 
     with pytest.raises(RuntimeError, match="do not match any parameter sets"):
         parse(griddle)
+
+
+def test_match_nest_unhashable_values():
+    nests = [{"bounds": [0.0, 1.0], "method": "brent"}, {"method": "newton"}]
+
+    assert _get_match(param_set={"bounds": [0.0, 1.0]}, nests=nests) == 0
+    assert _get_match(param_set={"bounds": [0.0, 2.0]}, nests=nests) is None
+    assert _get_match(param_set={"method": "newton", "bounds": [1]}, nests=nests) == 1
+
+
+def test_many_nests():
+    griddle = {
+        "schema": "v0.1",
+        "grid_parameters": {"scenario": list(range(1000)), "gamma": [0.1, 0.2]},
+        "nested_parameters": [{"scenario": i, "R0": i / 10} for i in range(1000)],
+    }
+
+    specs = parse(griddle).specs
+    assert len(specs) == 2000
+    assert specs[-1] == {"scenario": 999, "gamma": 0.2, "R0": 99.9}
+
+
+def test_count():
+    griddle = yaml.safe_load("""
+    schema: v0.1
+
+    baseline_parameters:
+      R0: 1.0
+
+    grid_parameters:
+      scenario: [baseline, optimistic, pessimistic]
+      gamma: [0.1, 0.2]
+
+    nested_parameters:
+      - scenario: optimistic
+        R0: 0.5
+    """)
+
+    assert count(griddle) == len(parse(griddle).specs) == 6
+    assert count({"schema": "v0.1", "baseline_parameters": {"R0": 1.0}}) == 1
+
+
+def test_parallel_parse():
+    griddle = {
+        "schema": "v0.1",
+        "baseline_parameters": {"R0": 1.0, "method": "brent"},
+        "grid_parameters": {"scenario": list(range(50)), "R0": [1.5, 2.0]},
+        "nested_parameters": [{"scenario": i, "gamma": i / 10} for i in range(50)],
+    }
+
+    serial = parse(griddle).specs
+    parallel = parse(griddle, workers=3).specs
+    assert parallel == serial
+    assert [list(ps) for ps in parallel] == [list(ps) for ps in serial]
+
+    griddle["nested_parameters"].append({"scenario": 50})
+    with pytest.raises(RuntimeError, match="do not match any parameter sets"):
+        parse(griddle, workers=3)
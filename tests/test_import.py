@@ -0,0 +1,52 @@
+import subprocess
+import sys
+
+
+def imported_modules(code: str) -> set[str]:
+    """Run code in a fresh interpreter, returning the modules it imported"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # importtime lines look like "import time: self | cumulative | module"
+    return {
+        line.split("|")[-1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:") and "|" in line
+    }
+
+
+def test_import_is_lazy():
+    modules = imported_modules("import griddler")
+    assert "griddler" in modules
+    assert not any(m.startswith(("jsonschema", "griddler.schemas")) for m in modules)
+
+
+def test_v01_does_not_import_jsonschema():
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, griddler\n"
+            "griddler.parse({'schema': 'v0.1', 'baseline_parameters': {}})\n"
+            "print(*sys.modules)",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    modules = result.stdout.split()
+    assert "griddler.schemas.v01" in modules
+    assert not any(m.startswith("jsonschema") for m in modules)
+
+
+def test_validator_is_compiled_once():
+    from griddler.schemas import v04
+
+    v04.parse({"schema": "v0.4", "experiment": []})
+    v04.parse({"schema": "v0.4", "experiment": [{}]})
+    assert v04._validator.cache_info().misses <= 1
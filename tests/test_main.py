@@ -1,9 +1,33 @@
 import contextlib
 import io
+import json
 
 import pytest
 
 import griddler.__main__
+import griddler.store
+from griddler.core import spec_id
+
+
+@pytest.fixture
+def griddle(tmp_path):
+    path = tmp_path / "griddle.yaml"
+    path.write_text(
+        "schema: v0.4\n"
+        "experiment:\n"
+        "  product:\n"
+        "    - [{R0: 1.5}, {R0: 2.0}]\n"
+        "    - [{gamma: 0.3}, {gamma: 0.4}]\n"
+    )
+    return path
+
+
+def run_cli(*args) -> str:
+    """Run the cli, returning what it writes to stdout"""
+    with contextlib.redirect_stdout(io.StringIO()) as f:
+        griddler.__main__.main(list(args))
+
+    return f.getvalue()
 
 
 def test_cli_help():
@@ -18,3 +42,210 @@ def test_cli_help():
 
     # Check that the output contains expected strings
     assert "usage" in result
+
+
+def test_cli_index(griddle):
+    assert json.loads(run_cli("--index", "2", str(griddle))) == {
+        "R0": 2.0,
+        "gamma": 0.3,
+    }
+
+
+def test_cli_shard(tmp_path):
+    griddle = tmp_path / "griddle.yaml"
+    griddle.write_text(
+        "schema: v0.4\n"
+        "experiment:\n"
+        "  product:\n"
+        "    - [{R0: 1.5}, {R0: 2.0}]\n"
+        "    - [{gamma: 0.3}, {gamma: 0.4}, {gamma: 0.5}]\n"
+    )
+
+    def run(*args):
+        return json.loads(run_cli(*args, str(griddle)))
+
+    shards = [run("--shard", f"{k}/4") for k in range(4)]
+    assert [spec for shard in shards for spec in shard] == run()
+
+    assert run("--shard", "1/4", "--shard-strategy", "strided") == [
+        {"R0": 1.5, "gamma": 0.4},
+        {"R0": 2.0, "gamma": 0.5},
+    ]
+
+
+def test_cli_ndjson(griddle):
+    output = run_cli("--to", "ndjson", str(griddle))
+    assert [json.loads(line) for line in output.splitlines()] == [
+        {"R0": 1.5, "gamma": 0.3},
+        {"R0": 1.5, "gamma": 0.4},
+        {"R0": 2.0, "gamma": 0.3},
+        {"R0": 2.0, "gamma": 0.4},
+    ]
+
+
+def test_cli_manifest(griddle, tmp_path):
+    manifest = tmp_path / "manifest.ndjson"
+    specs = json.loads(run_cli("--manifest", str(manifest), str(griddle)))
+    records = [json.loads(line) for line in manifest.read_text().splitlines()]
+    assert records == [{"index": i, "id": spec_id(x)} for i, x in enumerate(specs)]
+
+    run_cli(
+        "--manifest",
+        str(manifest),
+        "--shard",
+        "1/2",
+        "--shard-strategy",
+        "strided",
+        str(griddle),
+    )
+    records = [json.loads(line) for line in manifest.read_text().splitlines()]
+    assert records == [{"index": i, "id": spec_id(specs[i])} for i in [1, 3]]
+
+
+def test_cli_profile(griddle, tmp_path):
+    profile = tmp_path / "profile.json"
+    specs = json.loads(run_cli("--profile", str(profile), str(griddle)))
+    report = json.loads(profile.read_text())
+    assert report["parse"]["cardinality"] == len(specs) == 4
+    assert report["experiment"]["node"] == "ProductExperiment"
+
+
+def test_cli_profile_max_expand(griddle, tmp_path):
+    profile = tmp_path / "profile.json"
+    run_cli("--profile", str(profile), "--profile-max-expand", "2", str(griddle))
+    report = json.loads(profile.read_text())["experiment"]
+    assert report["cardinality"] == 4 and report["seconds"] is None
+    assert all(child["seconds"] is not None for child in report["children"])
+
+
+def test_cli_count(griddle):
+    assert run_cli("count", str(griddle)) == "4\n"
+
+
+def test_cli_max_specs(griddle):
+    assert len(json.loads(run_cli("--max-specs", "4", str(griddle)))) == 4
+
+    with pytest.raises(RuntimeError, match="more than the maximum of 3"):
+        run_cli("--max-specs", "3", str(griddle))
+
+
+def test_cli_where(griddle):
+    assert json.loads(
+        run_cli("--where", "R0>1.5", "--where", "gamma==0.4", str(griddle))
+    ) == [{"R0": 2.0, "gamma": 0.4}]
+
+
+def test_cli_where_bad_filter(griddle):
+    with pytest.raises(SystemExit):
+        with contextlib.redirect_stderr(io.StringIO()):
+            run_cli("--where", "R0", str(griddle))
+
+
+@pytest.mark.parametrize("method", ["uniform", "latin-hypercube"])
+def test_cli_sample(griddle, method):
+    args = ["--sample", "2", "--seed", "3", "--sample-method", method, str(griddle)]
+    specs = json.loads(run_cli(*args))
+    assert len(specs) == 2
+    assert specs == json.loads(run_cli(*args))
+
+
+def test_cli_explain(griddle):
+    assert run_cli("--explain", str(griddle)) == (
+        "parsed:\n"
+        "product: 4 Specs\n"
+        "  leaf: 2 Specs [R0]\n"
+        "  leaf: 2 Specs [gamma]\n"
+        "optimized:\n"
+        "product: 4 Specs\n"
+        "  leaf: 2 Specs [R0]\n"
+        "  leaf: 2 Specs [gamma]\n"
+    )
+
+
+def test_cli_diff(griddle, tmp_path):
+    new = tmp_path / "new.yaml"
+    new.write_text(griddle.read_text().replace("{gamma: 0.4}", "{gamma: 0.5}"))
+    removed = tmp_path / "removed.ndjson"
+
+    output = run_cli(
+        "diff", "--to", "ndjson", "--removed", str(removed), str(griddle), str(new)
+    )
+    assert [json.loads(line) for line in output.splitlines()] == [
+        {"R0": 1.5, "gamma": 0.5},
+        {"R0": 2.0, "gamma": 0.5},
+    ]
+    assert [json.loads(line) for line in removed.read_text().splitlines()] == [
+        {"R0": 1.5, "gamma": 0.4},
+        {"R0": 2.0, "gamma": 0.4},
+    ]
+
+
+@pytest.mark.parametrize("format", ["json", "ndjson"])
+def test_cli_jobs(griddle, format):
+    serial = run_cli("--to", format, str(griddle))
+    assert run_cli("--to", format, "--jobs", "2", str(griddle)) == serial
+
+
+def test_cli_binary(griddle, tmp_path):
+    output = tmp_path / "specs.griddler"
+    run_cli("--to", "binary", "--output", str(output), str(griddle))
+
+    with griddler.store.open(output) as store:
+        assert store.specs == json.loads(run_cli(str(griddle)))
+
+
+def test_cli_cache(griddle, tmp_path):
+    cache = tmp_path / "cache"
+    output = run_cli("--cache", str(cache), str(griddle))
+    assert len(list(cache.iterdir())) == 1
+    assert run_cli("--cache", str(cache), str(griddle)) == output
+
+
+@pytest.mark.parametrize("codec", ["stdlib", "auto"])
+def test_cli_codec(griddle, codec):
+    assert run_cli("--codec", codec, str(griddle)) == run_cli(str(griddle))
+
+
+@pytest.fixture
+def griddle_dir(tmp_path):
+    directory = tmp_path / "griddles"
+    directory.mkdir()
+    for i in range(3):
+        (directory / f"g{i}.yaml").write_text(
+            f"schema: v0.4\nexperiment:\n  product:\n    - [{{seed: {i}}}]\n"
+            "    - [{R0: 1.5}, {R0: 2.0}]\n"
+        )
+
+    (directory / "notes.txt").write_text("not a griddle")
+    return directory
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_cli_many_inputs_tagged(griddle_dir, jobs):
+    output = run_cli("--to", "ndjson", "--jobs", jobs, str(griddle_dir))
+    records = [json.loads(line) for line in output.splitlines()]
+    assert records == [
+        {"input": str(griddle_dir / f"g{i}.yaml"), "index": j, "spec": spec}
+        for i in range(3)
+        for j, spec in enumerate([{"seed": i, "R0": 1.5}, {"seed": i, "R0": 2.0}])
+    ]
+
+
+def test_cli_many_inputs_output_dir(griddle_dir, tmp_path):
+    output_dir = tmp_path / "out"
+    run_cli(
+        "--index", "-1", "--output-dir", str(output_dir), str(griddle_dir / "g*.yaml")
+    )
+
+    assert sorted(path.name for path in output_dir.iterdir()) == [
+        "g0.json",
+        "g1.json",
+        "g2.json",
+    ]
+    assert json.loads((output_dir / "g2.json").read_text()) == {"seed": 2, "R0": 2.0}
+
+
+def test_cli_many_inputs_need_tagged_format(griddle_dir):
+    with pytest.raises(SystemExit):
+        with contextlib.redirect_stderr(io.StringIO()):
+            run_cli(str(griddle_dir))
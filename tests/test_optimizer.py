@@ -0,0 +1,137 @@
+import random
+
+import pytest
+
+import griddler
+from griddler.core import Experiment, ProductExperiment, UnionExperiment
+from griddler.optimizer import explain, optimize
+
+
+def items(experiment: Experiment) -> list[list[tuple]]:
+    """Specs with their parameters in order"""
+    return [list(spec.items()) for spec in experiment]
+
+
+def random_tree(rng: random.Random, leaves: list[Experiment], depth: int) -> Experiment:
+    """A random tree of products and unions of these leaves"""
+    if depth == 0 or rng.random() < 0.3:
+        return rng.choice(leaves)
+
+    children = [random_tree(rng, leaves, depth - 1) for _ in range(rng.randint(1, 4))]
+    if rng.random() < 0.5:
+        return ProductExperiment(children)
+    else:
+        return UnionExperiment(children)
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_same_specs(seed):
+    rng = random.Random(seed)
+    leaves = [
+        Experiment([{"a": 1}]),
+        Experiment([{"a": 1.0}]),
+        Experiment([{"b": "x"}]),
+        Experiment([{"a": 2, "b": "y"}]),
+        Experiment([{"a": 3}, {"a": 4}]),
+        Experiment([{"c": 0}, {"c": 1}, {"c": 2}]),
+        Experiment([{"b": "z", "c": 5}, {"c": 6}]),
+    ]
+    # equal leaves that are not the same object
+    leaves += [Experiment(list(leaf)) for leaf in leaves]
+
+    experiment = random_tree(rng, leaves, depth=4)
+    assert items(optimize(experiment)) == items(experiment)
+
+
+def test_fold():
+    x = Experiment([{"R0": 1.5}, {"R0": 2.0}])
+    experiment = Experiment.product(
+        Experiment([{"seed": 1}]), Experiment([{"method": "brent"}]), x
+    )
+
+    optimized = optimize(experiment)
+    assert len(optimized.factors) == 2
+    assert optimized.factors[0].specs == [{"seed": 1, "method": "brent"}]
+    assert optimized.factors[1] is x
+
+
+def test_hoist_last_factors():
+    x = Experiment([{"R0": 1.5}, {"R0": 2.0}])
+    y = Experiment([{"gamma": 0.3}, {"gamma": 0.4}])
+    z = Experiment([{"method": "brent"}, {"method": "newton"}])
+    experiment = (x * z) | (y * z)
+
+    optimized = optimize(experiment)
+    assert isinstance(optimized, ProductExperiment)
+    assert optimized.factors[1] is z
+    assert items(optimized) == items(experiment)
+
+
+def test_no_hoist_of_first_factors_with_many_specs():
+    x = Experiment([{"R0": 1.5}, {"R0": 2.0}])
+    y = Experiment([{"gamma": 0.3}, {"gamma": 0.4}])
+    z = Experiment([{"method": "brent"}, {"method": "newton"}])
+    experiment = (x * y) | (x * z)
+
+    # x * (y | z) would have the Specs in a different order
+    assert isinstance(optimize(experiment), UnionExperiment)
+
+
+def test_passes():
+    experiment = Experiment([{"a": 1}]) * Experiment([{"b": 2}])
+    assert len(optimize(experiment, passes=["flatten", "hoist"]).factors) == 2
+    assert len(optimize(experiment, passes=["fold"]).specs) == 1
+
+    with pytest.raises(ValueError, match="Unknown optimizer passes"):
+        optimize(experiment, passes=["inline"])
+
+
+def test_explain():
+    x = Experiment([{"R0": 1.5}, {"R0": 2.0}])
+    y = Experiment([{"gamma": 0.3, "method": "brent"}])
+    assert explain((x * y) | y) == (
+        "union: 3 Specs\n"
+        "  product: 2 Specs\n"
+        "    leaf: 2 Specs [R0]\n"
+        "    leaf: 1 Spec [gamma, method]\n"
+        "  leaf: 1 Spec [gamma, method]\n"
+    )
+
+
+def test_parse_v01_grid_is_lazy():
+    griddle = {
+        "schema": "v0.1",
+        "baseline_parameters": {"method": "brent"},
+        "grid_parameters": {"R0": [1.5, 2.0], "gamma": [0.3, 0.4]},
+    }
+    assert explain(griddler.parse(griddle)) == (
+        "product: 4 Specs\n"
+        "  leaf: 2 Specs [R0]\n"
+        "  leaf: 2 Specs [gamma]\n"
+        "  leaf: 1 Spec [method]\n"
+    )
+
+
+def test_parse_optimizes():
+    griddles = [
+        {
+            "schema": "v0.3",
+            "parameters": {
+                "seed": {"fix": 1},
+                "method": {"fix": "brent"},
+                "R0": {"vary": [1.5, 2.0]},
+            },
+        },
+        {
+            "schema": "v0.4",
+            "experiment": {
+                "product": [[{"seed": 1}], [{"method": "brent"}], [{"R0": 1.5}]]
+            },
+        },
+    ]
+
+    for griddle in griddles:
+        parsed = griddler.parse(griddle, optimize=False)
+        optimized = griddler.parse(griddle)
+        assert items(optimized) == items(parsed)
+        assert explain(optimized).count("\n") < explain(parsed).count("\n")
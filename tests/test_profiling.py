@@ -0,0 +1,68 @@
+import json
+
+import griddler
+from griddler.profiling import profile_experiment
+
+
+def flatten(report: dict, key: str) -> list[dict]:
+    """All the reports in a tree of reports"""
+    return [report] + [x for child in report.get(key, []) for x in flatten(child, key)]
+
+
+def test_profile_v03():
+    griddle = {
+        "schema": "v0.3",
+        "parameters": {
+            "method": {"vary": ["newton", "brent"]},
+            "start_point": {
+                "if": {"equals": {"method": "newton"}},
+                "vary": [0.25, 0.5, 0.75],
+            },
+        },
+    }
+
+    experiment, report = griddler.profile(griddle)
+    assert experiment.specs == griddler.parse(griddle).specs
+
+    # the report is JSON-serializable
+    json.dumps(report)
+
+    steps = {x["name"]: x for x in flatten(report["parse"], "steps")}
+    assert steps["parse"]["cardinality"] == 4
+    assert steps["parameter method"]["cardinality"] == 2
+    assert steps["parameter start_point"]["cardinality"] == 4
+    assert all(x["seconds"] >= 0 and x["peak_bytes"] >= 0 for x in steps.values())
+
+    nodes = flatten(report["experiment"], "children")
+    assert nodes[0]["cardinality"] == 4
+    assert sum(x["cardinality"] for x in nodes[0]["children"]) == 4
+
+
+def test_profile_v04_nodes():
+    griddle = {
+        "schema": "v0.4",
+        "experiment": {
+            "product": [
+                [{"R0": 1.5}, {"R0": 2.0}],
+                {"union": [[{"gamma": 0.3}], [{"gamma": 0.4}, {"gamma": 0.5}]]},
+            ]
+        },
+    }
+
+    _, report = griddler.profile(griddle, optimize=False)
+    steps = [x["name"] for x in flatten(report["parse"], "steps")]
+    assert steps == ["parse", "validate", "product", "union"]
+
+    root = report["experiment"]
+    assert root["node"] == "ProductExperiment"
+    assert root["cardinality"] == 6
+    assert [x["cardinality"] for x in root["children"]] == [2, 3]
+    assert root["children"][1]["node"] == "UnionExperiment"
+
+
+def test_max_expand():
+    experiment = griddler.Experiment([{"R0": 1.5}, {"R0": 2.0}])
+    experiment *= griddler.Experiment([{"gamma": 0.3}, {"gamma": 0.4}])
+    report = profile_experiment(experiment, max_expand=3)
+    assert report["seconds"] is None
+    assert all(x["seconds"] is not None for x in report["children"])
@@ -0,0 +1,107 @@
+import threading
+
+import pytest
+
+import griddler
+from griddler.server import Client, LocalClient, Service, make_server
+
+GRIDDLE = {
+    "schema": "v0.4",
+    "experiment": {
+        "product": [
+            [{"R0": 1.5}, {"R0": 2.0}],
+            [{"gamma": 0.3}, {"gamma": 0.4, "bounds": [0.0, 1.0]}],
+        ]
+    },
+}
+
+SPECS = griddler.parse(GRIDDLE).specs
+
+
+def check_client(client):
+    assert client.count(GRIDDLE) == 4
+    assert client.spec(GRIDDLE, 1) == SPECS[1]
+    assert client.spec(GRIDDLE, -1) == SPECS[-1]
+    assert client.range(GRIDDLE, 1, 3) == SPECS[1:3]
+    assert client.range(GRIDDLE, 3, 10) == SPECS[3:]
+
+    with pytest.raises(RuntimeError, match="IndexError"):
+        client.spec(GRIDDLE, 4)
+
+
+def test_local_client():
+    check_client(LocalClient())
+
+
+def test_experiments_are_kept_warm():
+    service = Service(max_experiments=2)
+    client = LocalClient(service)
+    client.count(GRIDDLE)
+
+    # later requests name the Experiment by ID, without the griddle
+    status, answer = service.answer("count", {"id": griddler.cache.key(GRIDDLE)})
+    assert status == 200 and answer["count"] == 4
+
+    for i in range(2):
+        client.count({"schema": "v0.4", "experiment": [{"seed": i}]})
+
+    # the least recently used Experiment was dropped
+    status, _ = service.answer("count", {"id": griddler.cache.key(GRIDDLE)})
+    assert status == 404
+    assert client.count(GRIDDLE) == 4
+
+
+def test_reordered_griddles_are_different_experiments():
+    griddles = [
+        {
+            "schema": "v0.1",
+            "grid_parameters": {"R0": [1.5, 2.0], "gamma": [0.3, 0.4]},
+        },
+        {
+            "schema": "v0.1",
+            "grid_parameters": {"gamma": [0.3, 0.4], "R0": [1.5, 2.0]},
+        },
+    ]
+    client = LocalClient()
+    for griddle in griddles + griddles:
+        specs = client.range(griddle, 0, 4)
+        assert [list(spec.items()) for spec in specs] == [
+            list(spec.items()) for spec in griddler.parse(griddle).specs
+        ]
+
+
+def test_bad_requests():
+    service = Service()
+    assert service.answer("delete", {"griddle": GRIDDLE})[0] == 400
+    assert service.answer("count", {})[0] == 400
+    assert service.answer("count", {"griddle": {"schema": "v9"}})[0] == 400
+    assert service.answer("spec", {"griddle": GRIDDLE, "index": True})[0] == 400
+
+
+@pytest.fixture
+def serve():
+    """Start a server in a thread, returning a function that makes clients"""
+    servers = []
+
+    def start(**address):
+        server = make_server(**address)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_unix_socket_server(serve, tmp_path):
+    path = str(tmp_path / "griddler.sock")
+    serve(socket_path=path)
+    check_client(Client(socket_path=path))
+
+
+def test_http_server(serve):
+    server = serve(port=0)
+    check_client(Client(port=server.server_address[1]))
@@ -0,0 +1,107 @@
+import pickle
+
+import pytest
+
+import griddler.store
+from griddler.core import Experiment, Spec
+from griddler.optimizer import explain
+
+SPECS = [
+    {"method": "brent", "bounds": [0.0, 1.0]},
+    {"method": "newton", "start_point": {"x": 0.25, "label": "a\nb"}},
+    {},
+    {"method": "bisect", "bounds": [0.0, 2.0]},
+    {"R0": 1, "gamma": 1.0, "label": "é", "flag": True, "missing": None},
+]
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    path = tmp_path / "specs.griddler"
+    with open(path, "wb") as f:
+        griddler.store.write(iter(SPECS), f)
+
+    return path
+
+
+def test_round_trip(store_path):
+    with griddler.store.open(store_path) as store:
+        assert len(store) == len(SPECS)
+        assert store.specs == SPECS
+        assert [list(spec) for spec in store] == [list(spec) for spec in SPECS]
+        assert type(store[4]["R0"]) is int and type(store[4]["gamma"]) is float
+
+
+def test_lookup(store_path):
+    with griddler.store.open(store_path) as store:
+        assert store[3] == SPECS[3]
+        assert store[-1] == SPECS[-1]
+        assert isinstance(store[0], Spec)
+        assert store[0]._layout is store[3]._layout
+        assert list(store.shard(1, 2)) == SPECS[2:]
+
+        with pytest.raises(IndexError):
+            store[len(SPECS)]
+
+
+def test_layouts_are_interned(store_path):
+    # each distinct list of names is stored once
+    assert store_path.read_bytes().count(b'"bounds"') == 1
+
+
+def test_empty(tmp_path):
+    path = tmp_path / "empty.griddler"
+    with open(path, "wb") as f:
+        griddler.store.write([], f)
+
+    with griddler.store.open(path) as store:
+        assert len(store) == 0
+        assert store.specs == []
+
+
+def test_not_a_store(tmp_path):
+    path = tmp_path / "specs.json"
+    path.write_text("[]" * 100)
+
+    with pytest.raises(RuntimeError, match="Not a griddler spec store"):
+        griddler.store.open(path)
+
+
+def test_pickle(store_path):
+    with griddler.store.open(store_path) as store:
+        with pickle.loads(pickle.dumps(store)) as unpickled:
+            assert unpickled.specs == SPECS
+
+
+def test_store_of_experiment(tmp_path):
+    experiment = Experiment([{"R0": x} for x in range(100)]) * Experiment(
+        [{"gamma": 0.1}, {"gamma": 0.2}]
+    )
+    path = tmp_path / "specs.griddler"
+    with open(path, "wb") as f:
+        griddler.store.write(experiment, f)
+
+    with griddler.store.open(path) as store:
+        assert store[123] == experiment[123]
+        assert store.specs == experiment.specs
+
+
+def test_tree_round_trip(tmp_path):
+    x = Experiment([{"R0": 1.5}, {"R0": 2.0}])
+    y = Experiment([{"gamma": 0.3}])
+    z = Experiment([{"method": "brent"}, {"method": "newton", "tol": 0.1}])
+    experiment = (x * z) | (y * z) | x
+    path = tmp_path / "tree.griddler"
+    with open(path, "wb") as f:
+        griddler.store.write_tree(experiment, f)
+
+    with griddler.store.open(path) as store:
+        # each leaf is stored once
+        assert len(store) == len(x) + len(z) + len(y)
+        tree = store.tree()
+
+    assert [list(spec.items()) for spec in tree] == [
+        list(spec.items()) for spec in experiment
+    ]
+    assert explain(tree) == explain(experiment)
+    assert tree.branches[0].factors[1] is tree.branches[1].factors[1]
@@ -0,0 +1,81 @@
+import io
+import json
+
+import pytest
+
+from griddler.core import Experiment
+from griddler.writers import FORMATS, RECORD_SEPARATOR, write, write_experiment
+
+SPECS = [
+    {"method": "brent", "bounds": [0.0, 1.0]},
+    {"method": "newton", "start_point": {"x": 0.25, "label": "a\nb"}},
+    {},
+]
+
+
+def written(specs, format, **kwargs) -> str:
+    f = io.StringIO()
+    write(iter(specs), f, format, **kwargs)
+    return f.getvalue()
+
+
+@pytest.mark.parametrize("specs", [SPECS, SPECS[:1], []])
+@pytest.mark.parametrize("chunk_size", [1, 2, 1000])
+def test_json_matches_json_dump(specs, chunk_size):
+    assert written(specs, "json", chunk_size=chunk_size) == json.dumps(specs, indent=2)
+
+
+def test_ndjson():
+    text = written(SPECS, "ndjson", chunk_size=2)
+    assert text.endswith("\n")
+    assert [json.loads(line) for line in text.splitlines()] == SPECS
+
+
+def test_json_seq():
+    text = written(SPECS, "json-seq")
+    records = text.split(RECORD_SEPARATOR)
+    assert records[0] == ""
+    assert [json.loads(record) for record in records[1:]] == SPECS
+
+
+def test_write_is_lazy():
+    class Output(io.StringIO):
+        def flush(self):
+            flushed.append(self.getvalue().count("\n"))
+
+    def specs():
+        for i in range(5):
+            yield {"i": i}
+
+        # the first chunks must be written before the iterator is exhausted
+        assert flushed == [2, 4]
+
+    flushed = []
+    write(specs(), Output(), "ndjson", chunk_size=2)
+    assert flushed == [2, 4, 5]
+
+
+@pytest.mark.parametrize("format", [x for x in FORMATS if x != "binary"])
+@pytest.mark.parametrize(
+    "indices", [None, range(0), range(3, 40), range(1, 60, 7)], ids=repr
+)
+def test_parallel_output_is_identical(format, indices):
+    experiment = Experiment([{"R0": x} for x in range(6)]) * Experiment(
+        [{"gamma": 0.1}, {"gamma": 0.2, "bounds": [0.0, 1.0]}] * 5
+    )
+
+    def written_experiment(workers):
+        f = io.StringIO()
+        manifest = io.StringIO()
+        write_experiment(
+            experiment,
+            f,
+            format,
+            indices=indices,
+            workers=workers,
+            manifest=manifest,
+            chunk_size=4,
+        )
+        return f.getvalue(), manifest.getvalue()
+
+    assert written_experiment(workers=3) == written_experiment(workers=1)